@@ -0,0 +1,328 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import pickle
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from watchlist import STATEMENT_MODES, normalize_watchlist
+
+# ------------------------------
+# Headless batch runner
+#
+#   python batch.py watchlist.txt --workers 8 --out exports/
+#   python batch.py watchlist.txt --combined all_companies.xlsx
+#   python batch.py watchlist.txt --history     (also merge into history_store)
+#
+# Watchlist: one company per line, optionally "Name | Standalone";
+# blank lines and "#" comments are ignored.
+#
+# Companies are spread over a process pool (each worker has its own HTTP
+# sessions and, if needed, its own browser pool). Every finished company is
+# recorded in <out>/manifest.json, so re-running the same command after an
+# interruption only does what is left (--fresh starts over).
+# ------------------------------
+
+DEFAULT_WORKERS = int(os.environ.get("FINXTRACT_BATCH_WORKERS", str(os.cpu_count() or 2)))
+DEFAULT_OUT_DIR = "finxtract_output"
+MANIFEST_NAME = "manifest.json"
+PARTS_DIR_NAME = ".parts"
+
+# what an entry wrote: a pickled part for --combined, or its own workbook
+OUTPUT_PART = "part"
+OUTPUT_XLSX = "xlsx"
+
+
+def read_watchlist(path, default_mode="Consolidated"):
+
+    entries = []
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+
+            if "|" in line:
+                name, mode = (part.strip() for part in line.split("|", 1))
+                entries.append((name, mode.capitalize()))
+            else:
+                entries.append((line, default_mode))
+
+    return normalize_watchlist(entries)
+
+
+def entry_key(name, mode):
+    return f"{name}|{mode}"
+
+
+def _slug(name):
+    return re.sub(r"[^A-Za-z0-9]+", "_", name).strip("_") or "company"
+
+
+def part_file_name(name, mode):
+    # the slug alone can collide ("A&B Ltd" / "A B Ltd"); the key cannot
+    digest = hashlib.sha1(entry_key(name, mode).encode("utf-8")).hexdigest()[:10]
+    return f"{_slug(name)}-{mode.lower()}-{digest}.pkl"
+
+
+def company_file_name(name, mode):
+    # same naming as the UI download
+    return f"{name.replace(' ', '_')}-{mode.lower()}_screener.xlsx"
+
+
+# ------------------------------
+# Manifest (parent process only)
+# ------------------------------
+class Manifest:
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f).get("entries", {})
+        except (OSError, ValueError):
+            pass
+
+    def done(self, key, output=None):
+        # output: only count entries that wrote that kind of file
+        outcome = self.entries.get(key, {})
+        if outcome.get("status") != "ok":
+            return False
+        return output is None or outcome.get("output") == output
+
+    def record(self, key, outcome):
+
+        self.entries[key] = outcome
+
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"entries": self.entries}, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+# ------------------------------
+# Worker side
+# ------------------------------
+def _run_entry(name, mode, out_dir, combined, history=False):
+
+    import metrics
+    from scraper import scrape_screener_financials_by_name, to_excel_bytes
+
+    t0 = time.perf_counter()
+    outcome = {"name": name, "mode": mode, "status": "error"}
+
+    try:
+        with metrics.trace("batch entry", company=name, mode=mode) as trace:
+
+            company_url, tables = scrape_screener_financials_by_name(name, mode)
+            if not company_url:
+                raise LookupError(f"No Screener company found for {name!r}")
+            if not tables:
+                raise ValueError("no tables parsed")
+
+            if history:
+                from history_store import get_history_store
+                with metrics.span("history append"):
+                    outcome["history"] = get_history_store().append(company_url, mode, tables)
+
+            if combined:
+                # parsed tables are parked on disk; the parent stitches the
+                # combined workbook together once everything is in
+                output = OUTPUT_PART
+                path = os.path.join(out_dir, PARTS_DIR_NAME, part_file_name(name, mode))
+                data = pickle.dumps(tables, protocol=pickle.HIGHEST_PROTOCOL)
+            else:
+                output = OUTPUT_XLSX
+                path = os.path.join(out_dir, company_file_name(name, mode))
+                data = to_excel_bytes(tables)
+
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+
+            outcome.update(
+                status="ok", company_url=company_url, output=output, file=path, sections=len(tables)
+            )
+
+    except Exception as e:
+        outcome["error"] = f"{type(e).__name__}: {e}"
+
+    # where the time went, kept in the manifest next to the outcome
+    outcome["stages_ms"] = {
+        stage: round(row["ms"]) for stage, row in metrics.stage_totals(trace.to_dict()).items()
+    }
+    outcome["elapsed"] = round(time.perf_counter() - t0, 2)
+    return outcome
+
+
+# ------------------------------
+# Combined workbook
+# ------------------------------
+def _iter_parts(entries, manifest):
+
+    for name, mode in entries:
+        key = entry_key(name, mode)
+        if not manifest.done(key, OUTPUT_PART):
+            continue
+
+        outcome = manifest.entries[key]
+        with open(outcome["file"], "rb") as f:
+            tables = pickle.load(f)
+
+        title = name if mode == "Consolidated" else f"{name} ({mode})"
+        yield title, tables
+
+
+def write_combined(path, entries, manifest):
+
+    from excel_export import write_combined_workbook
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        write_combined_workbook(_iter_parts(entries, manifest), f)
+    os.replace(tmp, path)
+
+
+# ------------------------------
+# Batch
+# ------------------------------
+def run_batch(
+    entries,
+    out_dir=DEFAULT_OUT_DIR,
+    workers=DEFAULT_WORKERS,
+    combined=None,
+    fresh=False,
+    history=False,
+):
+
+    os.makedirs(out_dir, exist_ok=True)
+    if combined:
+        os.makedirs(os.path.join(out_dir, PARTS_DIR_NAME), exist_ok=True)
+
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    if fresh and os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    manifest = Manifest(manifest_path)
+    output = OUTPUT_PART if combined else OUTPUT_XLSX
+
+    # a finished entry only counts if it wrote the kind of file this run
+    # wants (switching --combined on / off redoes it) and the file is there
+    pending = [
+        (name, mode) for name, mode in entries
+        if not (
+            manifest.done(entry_key(name, mode), output)
+            and os.path.exists(manifest.entries[entry_key(name, mode)].get("file", ""))
+        )
+    ]
+
+    skipped = len(entries) - len(pending)
+    if skipped:
+        print(f"--- Resuming: {skipped} of {len(entries)} companies already done")
+
+    t0 = time.perf_counter()
+    done = 0
+
+    if pending:
+
+        workers = max(1, min(workers, len(pending)))
+
+        # the workers split each host's request budget between them
+        os.environ.setdefault("FINXTRACT_OUTBOUND_SHARE", str(workers))
+
+        # spawn: workers start clean instead of inheriting the parent's threads
+        ctx = multiprocessing.get_context("spawn")
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as executor:
+
+            futures = {
+                executor.submit(_run_entry, name, mode, out_dir, bool(combined), history): (name, mode)
+                for name, mode in pending
+            }
+
+            try:
+                for future in as_completed(futures):
+                    name, mode = futures[future]
+
+                    try:
+                        outcome = future.result()
+                    except Exception as e:
+                        # worker process died (crash, OOM kill, ...)
+                        outcome = {
+                            "name": name, "mode": mode, "status": "error",
+                            "error": f"{type(e).__name__}: {e}",
+                        }
+
+                    manifest.record(entry_key(name, mode), outcome)
+                    done += 1
+
+                    status = "ok" if outcome["status"] == "ok" else outcome["error"]
+                    print(
+                        f"--- [{done}/{len(pending)}] {name} ({mode}): {status}"
+                        f" in {outcome.get('elapsed', '?')}s"
+                    )
+
+            except KeyboardInterrupt:
+                for future in futures:
+                    future.cancel()
+                print("--- Interrupted; run the same command again to resume")
+                raise
+
+    failed = [
+        key for key in (entry_key(n, m) for n, m in entries)
+        if not manifest.done(key, output)
+    ]
+
+    if combined:
+        combined_path = combined if os.path.dirname(combined) else os.path.join(out_dir, combined)
+        write_combined(combined_path, entries, manifest)
+        print("--- Combined workbook:", combined_path)
+
+    print(
+        f"--- Batch finished in {time.perf_counter() - t0:.1f}s: "
+        f"{len(entries) - len(failed)} ok, {len(failed)} failed"
+    )
+
+    return manifest, failed
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Extract Screener financials for a watchlist.")
+    parser.add_argument("watchlist", help="text file, one company per line (optionally 'Name | Standalone')")
+    parser.add_argument("--mode", choices=STATEMENT_MODES, default="Consolidated",
+                        help="statement type for lines without one (default: Consolidated)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"worker processes (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--out", default=DEFAULT_OUT_DIR, help="output directory")
+    parser.add_argument("--combined", metavar="FILE.xlsx",
+                        help="write one workbook (a sheet per company) instead of one file per company")
+    parser.add_argument("--fresh", action="store_true", help="ignore the manifest and redo every company")
+    parser.add_argument("--history", action="store_true",
+                        help="also merge every scrape into the local Parquet history store")
+
+    args = parser.parse_args(argv)
+
+    entries = read_watchlist(args.watchlist, args.mode)
+    if not entries:
+        parser.error("watchlist is empty")
+
+    try:
+        _, failed = run_batch(
+            entries, args.out, args.workers, args.combined, args.fresh, args.history
+        )
+    except KeyboardInterrupt:
+        return 130
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,441 @@
+import asyncio
+import atexit
+import contextvars
+import os
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+import metrics
+
+# ------------------------------
+# Long-lived Chromium pool
+#
+# Playwright objects are bound to the event loop that created them, while
+# Streamlit runs every session on its own thread. The pool therefore owns a
+# single background event loop; sync callers submit coroutines to it and
+# async callers await them through wrap_future.
+# ------------------------------
+
+POOL_SIZE = int(os.environ.get("FINXTRACT_BROWSER_POOL_SIZE", "2"))
+MAX_PAGES_PER_BROWSER = int(os.environ.get("FINXTRACT_BROWSER_MAX_PAGES", "50"))
+MAX_BROWSER_RSS_MB = int(os.environ.get("FINXTRACT_BROWSER_MAX_RSS_MB", "1500"))
+RSS_SAMPLE_EVERY = max(1, int(os.environ.get("FINXTRACT_BROWSER_RSS_EVERY", "5")))    # pages
+
+# chromium ignores unknown switches, so a tagged one lets us find the
+# browser process (and its renderers) in /proc for memory accounting
+_MARKER_SWITCH = "--finxtract-pool-slot="
+
+
+# ------------------------------
+# Process memory helpers (Linux only, best effort)
+# ------------------------------
+def _read_proc_table():
+
+    procs = {}
+
+    try:
+        pids = [p for p in os.listdir("/proc") if p.isdigit()]
+    except OSError:
+        return procs
+
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as f:
+                stat = f.read().decode(errors="replace")
+            # comm may contain spaces, fields restart after the last ')'
+            fields = stat[stat.rfind(")") + 2:].split()
+            ppid = int(fields[1])
+            rss_pages = int(fields[21])
+        except (OSError, ValueError, IndexError):
+            continue
+
+        procs[int(pid)] = (ppid, rss_pages)
+
+    return procs
+
+
+def _find_marked_pid(marker):
+
+    needle = marker.encode()
+
+    try:
+        pids = [p for p in os.listdir("/proc") if p.isdigit()]
+    except OSError:
+        return None
+
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                if needle in f.read():
+                    return int(pid)
+        except OSError:
+            continue
+
+    return None
+
+
+def process_tree_rss_mb(root_pid):
+
+    if root_pid is None:
+        return None
+
+    procs = _read_proc_table()
+    if root_pid not in procs:
+        return None
+
+    children = {}
+    for pid, (ppid, _) in procs.items():
+        children.setdefault(ppid, []).append(pid)
+
+    total_pages = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        total_pages += procs.get(pid, (0, 0))[1]
+        stack.extend(children.get(pid, []))
+
+    return total_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+# ------------------------------
+# One pooled browser
+# ------------------------------
+class _BrowserSlot:
+
+    def __init__(self, index):
+        self.index = index
+        self.browser = None
+        self.marker = None
+        self.pid = None
+        self.active = 0
+        self.pages_served = 0
+        self.launches = 0
+        self.launched_at = None
+        self.launch_ms = None
+        self.retiring = False
+        self.rss_mb = None      # last sample, see sample_rss
+
+    def is_healthy(self):
+        return self.browser is not None and self.browser.is_connected()
+
+    async def sample_rss(self):
+
+        # scanning /proc takes a while with many processes, so it runs in a
+        # thread; a sample taken across a relaunch is dropped
+        marker, pid = self.marker, self.pid
+
+        def scan():
+            found = pid if pid is not None or not marker else _find_marked_pid(marker)
+            return found, process_tree_rss_mb(found)
+
+        pid, rss = await asyncio.to_thread(scan)
+        if self.marker == marker:
+            self.pid, self.rss_mb = pid, rss
+
+        return self.rss_mb
+
+    def snapshot(self):
+        return {
+            "slot": self.index,
+            "healthy": self.is_healthy(),
+            "active_contexts": self.active,
+            "pages_served": self.pages_served,
+            "launches": self.launches,
+            "launch_ms": self.launch_ms,
+            "uptime_s": round(time.time() - self.launched_at, 1) if self.launched_at else None,
+            "rss_mb": self.rss_mb if self.is_healthy() else None,
+            "retiring": self.retiring,
+        }
+
+
+class BrowserPool:
+
+    def __init__(
+        self,
+        size=POOL_SIZE,
+        max_pages=MAX_PAGES_PER_BROWSER,
+        max_rss_mb=MAX_BROWSER_RSS_MB,
+        launch_options=None,
+    ):
+        self.size = max(1, size)
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.launch_options = launch_options or {"headless": True}
+
+        self._slots = [_BrowserSlot(i) for i in range(self.size)]
+        self._loop = None
+        self._thread = None
+        self._playwright = None
+        self._lock = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+
+        self.stats = {
+            "contexts_created": 0,
+            "recycled_page_limit": 0,
+            "recycled_memory": 0,
+            "relaunched_unhealthy": 0,
+            "last_context_ms": None,
+        }
+
+    # ------------------------------
+    # Event loop thread
+    # ------------------------------
+    def _ensure_started(self):
+
+        if self._closed:
+            raise RuntimeError("Browser pool has been shut down")
+
+        if self._loop is not None:
+            return
+
+        with self._start_lock:
+            if self._loop is not None:
+                return
+
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            self._thread = threading.Thread(
+                target=run, name="finxtract-browser-pool", daemon=True
+            )
+            self._thread.start()
+            ready.wait()
+            self._loop = loop
+
+    async def _ensure_playwright(self):
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        if self._playwright is None:
+            from playwright.async_api import async_playwright
+            self._playwright = await async_playwright().start()
+
+    # ------------------------------
+    # Launch / retire browsers
+    # ------------------------------
+    async def _launch(self, slot):
+
+        if slot.browser is not None:
+            await self._close_browser(slot)
+
+        slot.marker = uuid.uuid4().hex
+        options = dict(self.launch_options)
+        options["args"] = list(options.get("args", [])) + [_MARKER_SWITCH + slot.marker]
+
+        t0 = time.perf_counter()
+        with metrics.span("browser launch", slot=slot.index):
+            slot.browser = await self._playwright.chromium.launch(**options)
+        slot.launch_ms = round((time.perf_counter() - t0) * 1000, 1)
+
+        slot.pid = None
+        slot.rss_mb = None
+        slot.pages_served = 0
+        slot.retiring = False
+        slot.launches += 1
+        slot.launched_at = time.time()
+
+    async def _close_browser(self, slot):
+
+        browser, slot.browser = slot.browser, None
+        slot.pid = None
+        slot.rss_mb = None
+        if browser is None:
+            return
+
+        try:
+            await browser.close()
+        except Exception:
+            pass
+
+    def _should_retire(self, slot):
+
+        if slot.pages_served >= self.max_pages:
+            self.stats["recycled_page_limit"] += 1
+            return True
+
+        if self.max_rss_mb:
+            rss = slot.rss_mb
+            if rss is not None and rss > self.max_rss_mb:
+                self.stats["recycled_memory"] += 1
+                return True
+
+        return False
+
+    async def _checkout(self):
+
+        await self._ensure_playwright()
+
+        async with self._lock:
+
+            candidates = [s for s in self._slots if not s.retiring]
+            if not candidates:
+                candidates = self._slots
+
+            slot = min(candidates, key=lambda s: s.active)
+
+            if not slot.is_healthy():
+                if slot.browser is not None:
+                    self.stats["relaunched_unhealthy"] += 1
+                await self._launch(slot)
+
+            slot.active += 1
+            return slot
+
+    async def _checkin(self, slot):
+
+        # memory is sampled every few pages, outside the lock; the retire
+        # decision below uses the latest sample
+        if self.max_rss_mb and (slot.pages_served + 1) % RSS_SAMPLE_EVERY == 0:
+            await slot.sample_rss()
+
+        async with self._lock:
+            slot.active -= 1
+            slot.pages_served += 1
+
+            if not slot.retiring and self._should_retire(slot):
+                slot.retiring = True
+
+            # drain first, then recycle so in-flight scrapes are not cut off
+            if slot.retiring and slot.active == 0:
+                await self._close_browser(slot)
+                slot.retiring = False
+
+    async def _retire(self, slot):
+
+        # a slot serving scrapes drains first (see _checkin); an idle one goes now
+        async with self._lock:
+            if slot.active:
+                slot.retiring = True
+            else:
+                await self._close_browser(slot)
+
+    # ------------------------------
+    # Public API (pool loop side)
+    # ------------------------------
+    @asynccontextmanager
+    async def context(self, **context_options):
+
+        slot = await self._checkout()
+
+        try:
+            t0 = time.perf_counter()
+            ctx = await slot.browser.new_context(**context_options)
+            self.stats["last_context_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+            self.stats["contexts_created"] += 1
+
+            try:
+                yield ctx
+            finally:
+                try:
+                    await ctx.close()
+                except Exception:
+                    pass
+        finally:
+            await self._checkin(slot)
+
+    # ------------------------------
+    # Public API (any thread / any loop)
+    # ------------------------------
+    def submit(self, coro_fn, *args, **kwargs):
+
+        self._ensure_started()
+
+        # scheduled from inside the caller's contextvars, so the task on the
+        # pool loop sees the caller's metrics trace / span
+        return contextvars.copy_context().run(
+            asyncio.run_coroutine_threadsafe, coro_fn(*args, **kwargs), self._loop
+        )
+
+    def run(self, coro_fn, *args, timeout=None, **kwargs):
+        return self.submit(coro_fn, *args, **kwargs).result(timeout)
+
+    async def run_async(self, coro_fn, *args, **kwargs):
+        return await asyncio.wrap_future(self.submit(coro_fn, *args, **kwargs))
+
+    def health(self, probe=False):
+
+        if self._loop is None:
+            return {"started": False, "slots": [], **self.stats}
+
+        async def _health():
+            for slot in self._slots:
+                if slot.is_healthy():
+                    await slot.sample_rss()
+            if probe:
+                for slot in self._slots:
+                    if slot.is_healthy() and not slot.retiring:
+                        try:
+                            ctx = await slot.browser.new_context()
+                            await ctx.close()
+                        except Exception:
+                            await self._retire(slot)
+            return [s.snapshot() for s in self._slots]
+
+        slots = self.run(_health, timeout=30)
+        return {"started": True, "slots": slots, **self.stats}
+
+    def close(self, timeout=30):
+
+        if self._closed:
+            return
+        self._closed = True
+
+        if self._loop is None:
+            return
+
+        async def _shutdown():
+            for slot in self._slots:
+                await self._close_browser(slot)
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+
+        try:
+            asyncio.run_coroutine_threadsafe(_shutdown(), self._loop).result(timeout)
+        except Exception:
+            pass
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout)
+
+
+# ------------------------------
+# Process-wide pool
+# ------------------------------
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool():
+
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = BrowserPool()
+                # streamlit stops the server and then lets the interpreter
+                # exit, so atexit is where chromium gets torn down cleanly
+                atexit.register(_pool.close)
+
+    return _pool
+
+
+def shutdown_browser_pool():
+
+    global _pool
+
+    with _pool_lock:
+        pool, _pool = _pool, None
+
+    if pool is not None:
+        pool.close()
@@ -0,0 +1,254 @@
+import bisect
+import difflib
+import json
+import os
+import re
+import threading
+import time
+
+from snapshot_cache import CACHE_DIR
+
+# ------------------------------
+# Local Screener company index
+#
+# Every search API response is folded into a persisted name -> URL map, so
+# companies we have seen once resolve from memory afterwards. Raw API
+# responses are also memoized in-process for a short TTL.
+# ------------------------------
+
+INDEX_PATH = os.path.join(CACHE_DIR, "company_index.json")
+SEARCH_MEMO_TTL = int(os.environ.get("FINXTRACT_SEARCH_MEMO_TTL", "900"))
+
+# resolution must be conservative: a wrong company is worse than one more
+# HTTP round-trip, so fuzzy matches only count when they are near-identical
+FUZZY_RESOLVE_CUTOFF = 0.92
+
+_SUFFIXES = re.compile(r"\b(ltd|limited|inc|corp|corporation|co)\b")
+_NON_WORD = re.compile(r"[^a-z0-9& ]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_company_name(name):
+
+    s = str(name).lower().replace(".", " ")
+    s = _NON_WORD.sub(" ", s)
+    s = _SUFFIXES.sub(" ", s)
+    return _SPACES.sub(" ", s).strip()
+
+
+class CompanyIndex:
+
+    def __init__(self, path=INDEX_PATH, memo_ttl=SEARCH_MEMO_TTL):
+        self.path = path
+        self.memo_ttl = memo_ttl
+
+        self._lock = threading.Lock()
+        self._loaded = False
+
+        # normalized name / past query -> screener path ("/company/TCS/")
+        self._urls = {}
+        self._display = {}
+        self._sorted_names = []
+
+        self._memo = {}
+
+        self.stats = {
+            "index_hits": 0,
+            "memo_hits": 0,
+            "api_calls": 0,
+        }
+
+    # ------------------------------
+    # Persistence
+    # ------------------------------
+    def _load(self):
+
+        if self._loaded:
+            return
+
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+
+        self._urls = data.get("urls", {})
+        self._display = data.get("display", {})
+        self._sorted_names = sorted(self._display)
+        self._loaded = True
+
+    def _save(self):
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"urls": self._urls, "display": self._display}, f)
+        os.replace(tmp, self.path)
+
+    # ------------------------------
+    # Learning from search responses
+    # ------------------------------
+    def add_search_results(self, query, results):
+
+        with self._lock:
+            self._load()
+
+            changed = False
+
+            for item in results:
+                name, url = item.get("name"), item.get("url")
+                # skip the "search everywhere" style entries
+                if not name or not url or not url.startswith("/company/"):
+                    continue
+
+                key = normalize_company_name(name)
+                if not key:
+                    continue
+
+                if self._urls.get(key) != url:
+                    self._urls[key] = url
+                    changed = True
+
+                if key not in self._display:
+                    self._display[key] = name
+                    bisect.insort(self._sorted_names, key)
+                    changed = True
+
+            best = pick_search_result(query, results)
+            query_key = normalize_company_name(query)
+
+            # remember what the user typed -> what we resolved it to
+            if (
+                best
+                and query_key
+                and str(best.get("url", "")).startswith("/company/")
+                and self._urls.get(query_key) != best["url"]
+            ):
+                self._urls[query_key] = best["url"]
+                changed = True
+
+            if changed:
+                self._save()
+
+    # ------------------------------
+    # In-memory lookups
+    # ------------------------------
+    def prefix_matches(self, prefix, limit=10):
+
+        key = normalize_company_name(prefix)
+        if not key:
+            return []
+
+        with self._lock:
+            self._load()
+            names = self._sorted_names
+            start = bisect.bisect_left(names, key)
+
+            matches = []
+            for name in names[start:start + limit]:
+                if not name.startswith(key):
+                    break
+                matches.append((self._display[name], self._urls[name]))
+
+        return matches
+
+    def fuzzy_matches(self, query, limit=5, cutoff=0.6):
+
+        key = normalize_company_name(query)
+        if not key:
+            return []
+
+        with self._lock:
+            self._load()
+            names = difflib.get_close_matches(key, self._sorted_names, n=limit, cutoff=cutoff)
+            return [(self._display[n], self._urls[n]) for n in names]
+
+    def resolve(self, query):
+
+        key = normalize_company_name(query)
+        if not key:
+            return None
+
+        with self._lock:
+            self._load()
+
+            url = self._urls.get(key)
+            if url is None:
+                close = difflib.get_close_matches(
+                    key, self._sorted_names, n=1, cutoff=FUZZY_RESOLVE_CUTOFF
+                )
+                if close:
+                    url = self._urls[close[0]]
+
+            if url is not None:
+                self.stats["index_hits"] += 1
+
+        return url
+
+    # ------------------------------
+    # Memoized search API
+    # ------------------------------
+    def memo_get(self, query):
+
+        key = normalize_company_name(query)
+
+        with self._lock:
+            hit = self._memo.get(key)
+            if hit is None:
+                return None
+
+            expires_at, results = hit
+            if time.monotonic() > expires_at:
+                del self._memo[key]
+                return None
+
+            self.stats["memo_hits"] += 1
+            return results
+
+    def memo_put(self, query, results):
+
+        with self._lock:
+            self.stats["api_calls"] += 1
+
+            now = time.monotonic()
+            if len(self._memo) > 1000:
+                self._memo = {k: v for k, v in self._memo.items() if v[0] > now}
+
+            self._memo[normalize_company_name(query)] = (
+                now + self.memo_ttl,
+                results,
+            )
+
+
+def pick_search_result(query, results):
+
+    if not results:
+        return None
+
+    key = normalize_company_name(query)
+
+    for item in results:
+        if item.get("url") and normalize_company_name(item.get("name", "")) == key:
+            return item
+
+    return results[0]
+
+
+# ------------------------------
+# Process-wide index
+# ------------------------------
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_company_index():
+
+    global _index
+
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = CompanyIndex()
+
+    return _index
@@ -0,0 +1,165 @@
+import asyncio
+import threading
+import time
+
+# ------------------------------
+# Small thread primitives shared by the network clients
+# ------------------------------
+
+
+class TokenBucket:
+
+    # `rate` tokens per second, at most `burst` saved up
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+
+    def acquire(self):
+
+        # blocks until a token is free; returns how long we waited
+        if self.rate <= 0:
+            return 0.0
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+
+            time.sleep(delay)
+            waited += delay
+
+
+class _Call:
+
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        # wake-ups for waiters on an event loop (see do_async)
+        self.waiters = []
+
+
+class SingleFlight:
+
+    # concurrent calls for the same key share one execution of fn; fn may be
+    # a plain function (do) or a coroutine function (do_async), and callers
+    # of either kind can wait on the other's execution
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = {"leaders": 0, "shared": 0}
+
+    def _join(self, key, waiter=None):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats["leaders"] += 1
+            elif waiter is not None:
+                call.waiters.append(waiter)
+        return call, leader
+
+    def _shared(self):
+        # only callers that actually got the leader's outcome; a waiter
+        # that retries after a cancelled leader is not one
+        with self._lock:
+            self.stats["shared"] += 1
+
+    def _finish(self, key, call):
+        with self._lock:
+            self._calls.pop(key, None)
+            waiters = list(call.waiters)
+        call.done.set()
+        for wake in waiters:
+            wake()
+
+    @staticmethod
+    def _abandoned(call):
+        # the leader was cancelled (timed out, not failed): waiters retry,
+        # and one of them takes over the execution
+        return isinstance(call.error, asyncio.CancelledError)
+
+    def do(self, key, fn, *args):
+
+        # returns (result, shared); shared is True for callers that waited
+        while True:
+            call, leader = self._join(key)
+            if leader:
+                break
+            call.done.wait()
+            if self._abandoned(call):
+                continue
+            self._shared()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            self._finish(key, call)
+
+        return call.result, False
+
+    async def do_async(self, key, fn, *args):
+
+        # like do(), awaiting fn(*args); cancelling a waiter only stops its
+        # wait, cancelling the leader hands the execution to a waiter
+        loop = asyncio.get_running_loop()
+
+        while True:
+            woken = loop.create_future()
+
+            def wake(woken=woken):
+                try:
+                    loop.call_soon_threadsafe(lambda: woken.done() or woken.set_result(None))
+                except RuntimeError:
+                    pass    # that loop is gone
+
+            call, leader = self._join(key, wake)
+            if leader:
+                break
+            await woken
+            if self._abandoned(call):
+                continue
+            self._shared()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = await fn(*args)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            self._finish(key, call)
+
+        return call.result, False
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
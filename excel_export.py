@@ -0,0 +1,204 @@
+import math
+import re
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import metrics
+from normalize import format_value, period_label
+
+# ------------------------------
+# Streaming Excel export
+#
+# Sheets are written row by row with openpyxl's write-only workbook, so
+# memory stays flat no matter how many sections a company has. Raw PDF
+# hyperlinks come straight from df.attrs["links"] (row/column positions
+# the parser already recorded) while the row is written; nothing is
+# scanned afterwards. Workbook bytes are memoized per fetched result so
+# repeated downloads / UI reruns do not rebuild them.
+# ------------------------------
+
+EXPORT_CACHE_SIZE = 8
+
+_BAD_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+_LINK_FONT = None
+_TITLE_FONT = None
+
+
+def _link_font():
+
+    global _LINK_FONT
+
+    if _LINK_FONT is None:
+        from openpyxl.styles import Font
+        _LINK_FONT = Font(color="0563C1", underline="single")
+
+    return _LINK_FONT
+
+
+def _title_font():
+
+    global _TITLE_FONT
+
+    if _TITLE_FONT is None:
+        from openpyxl.styles import Font
+        _TITLE_FONT = Font(bold=True, size=12)
+
+    return _TITLE_FONT
+
+
+def _cell_value(v, percent):
+
+    if v is None:
+        return None
+
+    if isinstance(v, float):
+        if math.isnan(v):
+            return None
+        return format_value(v, percent=True) if percent else v
+
+    if hasattr(v, "item"):     # numpy scalar
+        return _cell_value(v.item(), percent)
+
+    return v
+
+
+def _write_sheet(ws, df):
+
+    from openpyxl.cell import WriteOnlyCell
+
+    percent_rows = df.attrs.get("percent_rows", set())
+    links = df.attrs.get("links", {})
+
+    ws.append([period_label(c) for c in df.columns])
+
+    for pos, row in enumerate(df.itertuples(index=False, name=None)):
+
+        percent = pos in percent_rows
+        cells = [_cell_value(v, percent and i > 0) for i, v in enumerate(row)]
+
+        for col, url in links.get(pos, {}).items():
+            cell = WriteOnlyCell(ws, value="Raw PDF")
+            cell.hyperlink = url
+            cell.font = _link_font()
+            cells[col] = cell
+
+        ws.append(cells)
+
+
+def _write_stacked_sheet(ws, tables):
+
+    from openpyxl.cell import WriteOnlyCell
+
+    # every section under its own title row, one blank row apart
+    for i, (section, df) in enumerate(tables.items()):
+        if i:
+            ws.append([])
+        title = WriteOnlyCell(ws, value=section)
+        title.font = _title_font()
+        ws.append([title])
+        _write_sheet(ws, df)
+
+
+def _unique_title(title, used):
+
+    # Excel forbids []:*?/\ in sheet names
+    title = _BAD_SHEET_CHARS.sub("-", title).strip()[:31] or "Sheet"
+    n = 2
+    candidate = title
+    while candidate.lower() in used:
+        suffix = f" ({n})"
+        candidate = title[:31 - len(suffix)] + suffix
+        n += 1
+
+    used.add(candidate.lower())
+    return candidate
+
+
+def write_workbook(dfs, out):
+
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+
+    for sheet, df in dfs.items():
+        _write_sheet(wb.create_sheet(title=sheet[:31]), df)
+
+    wb.save(out)
+
+
+def write_combined_workbook(companies, out):
+
+    # companies: iterable of (sheet title, {section: df}); consumed lazily so
+    # only one company's tables need to be in memory at a time
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    used = set()
+
+    for title, tables in companies:
+        _write_stacked_sheet(wb.create_sheet(title=_unique_title(title, used)), tables)
+
+    wb.save(out)
+
+
+def workbook_bytes(dfs):
+
+    buf = BytesIO()
+    write_workbook(dfs, buf)
+    return buf.getvalue()
+
+
+# ------------------------------
+# Memoized bytes per fetched result
+# ------------------------------
+class ExportCache:
+
+    def __init__(self, size=EXPORT_CACHE_SIZE):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "builds": 0}
+
+    def get(self, dfs, key=None):
+
+        # a fetch produces a new dict of new frames, so identity is enough
+        # to tell "same data"; the dict is kept alive so its id stays valid
+        key = key if key is not None else id(dfs)
+
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[0] is dfs:
+                self._items.move_to_end(key)
+                self.stats["hits"] += 1
+                metrics.count("memo_hit")
+                return item[1]
+
+        data = workbook_bytes(dfs)
+
+        with self._lock:
+            self._items[key] = (dfs, data)
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+            self.stats["builds"] += 1
+        metrics.count("built")
+
+        return data
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_export_cache():
+
+    global _cache
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ExportCache()
+
+    return _cache
@@ -0,0 +1,170 @@
+import time
+
+# ------------------------------
+# In-page table expansion
+#
+# The helpers below are injected into every scrape context. They track
+# in-flight fetch/XHR calls and DOM mutations so the scraper can wait for
+# "nothing is loading and nothing is changing" instead of sleeping for a
+# fixed number of milliseconds.
+# ------------------------------
+
+PAGE_HELPERS_JS = r"""
+(() => {
+  if (window.__fx) return;
+
+  const fx = { inflight: 0, lastMutation: performance.now() };
+  window.__fx = fx;
+
+  // ---- count in-flight network calls made by the page
+  const origFetch = window.fetch;
+  if (origFetch) {
+    window.fetch = function (...args) {
+      fx.inflight++;
+      return origFetch.apply(this, args).finally(() => { fx.inflight--; });
+    };
+  }
+
+  const origSend = XMLHttpRequest.prototype.send;
+  XMLHttpRequest.prototype.send = function (...args) {
+    fx.inflight++;
+    this.addEventListener("loadend", () => { fx.inflight--; }, { once: true });
+    return origSend.apply(this, args);
+  };
+
+  // ---- remember when the DOM last changed
+  const watch = () => {
+    new MutationObserver(() => { fx.lastMutation = performance.now(); })
+      .observe(document.documentElement, { childList: true, subtree: true });
+  };
+  if (document.documentElement) watch();
+  else document.addEventListener("DOMContentLoaded", watch);
+
+  fx.waitQuiet = (settleMs, timeoutMs) => new Promise(resolve => {
+    const start = performance.now();
+    const tick = () => {
+      const now = performance.now();
+      const quiet = fx.inflight <= 0 && now - fx.lastMutation >= settleMs;
+      if (quiet || now - start >= timeoutMs) return resolve(quiet);
+      setTimeout(tick, 25);
+    };
+    tick();
+  });
+
+  // ---- same table set as "//h2/following::table[1] | //h3/following::table[1]"
+  fx.sectionTables = () => {
+    const snap = document.evaluate(
+      "//h2/following::table[1] | //h3/following::table[1]",
+      document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+    );
+    const out = [];
+    for (let i = 0; i < snap.snapshotLength; i++) out.push(snap.snapshotItem(i));
+    return out;
+  };
+
+  // 👉 IMPORTANT: handle BOTH + and >
+  const isExpander = b => {
+    if (b.dataset.fxExpanded) return false;
+    return Array.from(b.querySelectorAll("span")).some(s =>
+      s.classList.contains("blue-icon") &&
+      ["+", ">"].includes(s.textContent.trim())
+    );
+  };
+
+  fx.expandAll = async ({ settleMs, roundTimeoutMs, maxRounds }) => {
+    const t0 = performance.now();
+    const tables = fx.sectionTables();
+    const countRows = () => tables.reduce((n, t) => n + t.querySelectorAll("tr").length, 0);
+
+    const startRows = countRows();
+    let clicks = 0, rounds = 0, timedOut = 0;
+
+    // every round clicks all visible expanders at once; rows they insert
+    // may carry nested expanders, which the next round picks up
+    while (rounds < maxRounds) {
+      const pending = [];
+      for (const t of tables)
+        for (const b of t.querySelectorAll("button"))
+          if (isExpander(b)) pending.push(b);
+
+      if (!pending.length) break;
+      rounds++;
+
+      for (const b of pending) {
+        b.dataset.fxExpanded = "1";
+        b.click();
+        clicks++;
+      }
+
+      if (!(await fx.waitQuiet(settleMs, roundTimeoutMs))) timedOut++;
+    }
+
+    return {
+      clicks,
+      rounds,
+      timed_out_rounds: timedOut,
+      rows_expanded: countRows() - startRows,
+      ms: Math.round(performance.now() - t0),
+    };
+  };
+
+  // CMP cells in the peer table are filled in by JS after the table shows up
+  fx.peerCmpReady = () => {
+    const h = Array.from(document.querySelectorAll("h2"))
+      .find(e => e.textContent.trim() === "Peer comparison");
+    if (!h) return false;
+    const table = document.evaluate(
+      "following::table[1]", h, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+    ).singleNodeValue;
+    if (!table) return false;
+
+    const headers = Array.from(table.querySelectorAll("tr:first-child th"))
+      .map(th => th.textContent.trim().toLowerCase());
+    const col = headers.findIndex(t => t.startsWith("cmp"));
+    // only numbered peer rows; the median/summary row may legitimately be blank
+    const rows = Array.from(table.querySelectorAll("tbody tr"))
+      .filter(tr => tr.querySelectorAll("td").length > col)
+      .filter(tr => /^\d+\.?$/.test(tr.querySelectorAll("td")[0].textContent.trim()));
+    if (col < 0 || !rows.length) return false;
+
+    return rows.every(tr => tr.querySelectorAll("td")[col].textContent.trim() !== "");
+  };
+})();
+"""
+
+SETTLE_MS = 150
+ROUND_TIMEOUT_MS = 8000
+MAX_ROUNDS = 10
+
+
+async def install_page_helpers(context):
+    await context.add_init_script(PAGE_HELPERS_JS)
+
+
+async def wait_for_page_quiet(page, settle_ms=SETTLE_MS, timeout_ms=ROUND_TIMEOUT_MS):
+    return await page.evaluate(
+        "([s, t]) => window.__fx.waitQuiet(s, t)", [settle_ms, timeout_ms]
+    )
+
+
+async def wait_for_peer_cmp(page, timeout_ms=10000):
+
+    try:
+        await page.wait_for_function("() => window.__fx.peerCmpReady()", timeout=timeout_ms)
+        return True
+    except Exception:
+        # best effort: an empty CMP cell should not fail the whole scrape
+        return False
+
+
+async def expand_all_tables(page):
+
+    t0 = time.perf_counter()
+
+    report = await page.evaluate(
+        "opts => window.__fx.expandAll(opts)",
+        {"settleMs": SETTLE_MS, "roundTimeoutMs": ROUND_TIMEOUT_MS, "maxRounds": MAX_ROUNDS},
+    )
+    report["total_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+
+    return report
@@ -0,0 +1,456 @@
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+try:
+    import fcntl
+except ImportError:     # Windows: only threads in one process are serialized
+    fcntl = None
+
+from snapshot_cache import BASE_DIR
+
+# ------------------------------
+# Columnar history of section tables
+#
+# Section tables are stored "long": one fact per (section, row, period) in
+# Parquet files under <dir>/<company>/<mode>/. Every scrape is merged in by
+# writing a new append-only part file holding only the facts that are new
+# or changed; changed facts are also written to a revisions file with the
+# previous value. Reads take the newest fact per key and pivot back to the
+# same wide frame parse_screener_snapshots returns.
+#
+# Files are numbered from one sequence per directory (part-<seq>-...), which
+# is the order reads apply them in. Writers (batch workers are separate
+# processes) hold an exclusive flock on <dir>/.lock while they diff, number
+# and compact; readers hold it shared. Past HISTORY_COMPACT_PARTS part files
+# they are folded into one holding the latest facts, so an append diffs
+# against a bounded number of files rather than the whole history.
+#
+# Only sections with period columns ("Mar 2024", ...) are stored; other
+# value columns of those sections (e.g. TTM) ride along under their label.
+# ------------------------------
+
+HISTORY_DIR = os.environ.get(
+    "FINXTRACT_HISTORY_DIR", os.path.join(BASE_DIR, ".finxtract_history")
+)
+HISTORY_COMPACT_PARTS = int(os.environ.get("FINXTRACT_HISTORY_COMPACT_PARTS", "8"))
+
+_KEY = ["section", "label", "occurrence", "period"]
+_SLUG = re.compile(r"[^A-Za-z0-9_-]+")
+_SEQ = re.compile(r"^[a-z]+-(\d+)")
+
+
+def company_key(company_url):
+
+    # https://www.screener.in/company/TCS/consolidated/ -> TCS
+    parts = [p for p in urlsplit(company_url).path.split("/") if p]
+    if len(parts) >= 2 and parts[0] == "company":
+        return _SLUG.sub("_", parts[1]).upper()
+
+    return _SLUG.sub("_", company_url).strip("_").upper()
+
+
+def _schema():
+
+    import pyarrow as pa
+
+    return pa.schema([
+        ("section", pa.string()),
+        ("label_header", pa.string()),
+        ("label", pa.string()),
+        ("occurrence", pa.int32()),
+        ("row", pa.int32()),
+        ("period", pa.string()),
+        ("period_ord", pa.int32()),     # year * 12 + month - 1; null for TTM etc.
+        ("column", pa.int32()),
+        ("value", pa.float64()),
+        ("text", pa.string()),
+        ("percent", pa.bool_()),
+        ("bold", pa.bool_()),
+        ("link", pa.string()),
+        ("scraped_at", pa.timestamp("s")),
+    ])
+
+
+def _period_ord(col):
+
+    import pandas as pd
+
+    if isinstance(col, pd.Period):
+        return col.year * 12 + col.month - 1
+
+    return None
+
+
+def table_to_facts(section, df, scraped_at):
+
+    import pandas as pd
+
+    from normalize import period_label
+
+    if df.shape[1] < 2 or not any(isinstance(c, pd.Period) for c in df.columns[1:]):
+        return []
+
+    percent_rows = df.attrs.get("percent_rows", set())
+    bold_rows = df.attrs.get("bold_rows", set())
+    links = df.attrs.get("links", {})
+
+    label_header = str(df.columns[0])
+    periods = [(i, period_label(c), _period_ord(c)) for i, c in enumerate(df.columns) if i]
+
+    facts = []
+    seen = {}
+
+    for pos, row in enumerate(df.itertuples(index=False, name=None)):
+
+        label = "" if row[0] is None or row[0] != row[0] else str(row[0])
+        occurrence = seen.get(label, 0)
+        seen[label] = occurrence + 1
+
+        row_links = links.get(pos, {})
+
+        for i, period, ordinal in periods:
+            v = row[i]
+            value, text = None, None
+            if isinstance(v, float):
+                value = None if v != v else v
+            elif v is not None:
+                text = str(v)
+
+            facts.append({
+                "section": section,
+                "label_header": label_header,
+                "label": label,
+                "occurrence": occurrence,
+                "row": pos,
+                "period": period,
+                "period_ord": ordinal,
+                "column": i,
+                "value": value,
+                "text": text,
+                "percent": pos in percent_rows,
+                "bold": pos in bold_rows,
+                "link": row_links.get(i),
+                "scraped_at": scraped_at,
+            })
+
+    return facts
+
+
+def _seq(path):
+    m = _SEQ.match(os.path.basename(path))
+    return int(m.group(1)) if m else 0
+
+
+@contextmanager
+def _dir_lock(directory, shared=False):
+
+    if fcntl is None or (shared and not os.path.isdir(directory)):
+        yield
+        return
+
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, ".lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _same(a, b):
+
+    # NaN == NaN / None == None count as unchanged
+    for field in ("value", "text", "link"):
+        x, y = a.get(field), b.get(field)
+        if x != y and not (x is None and y is None) and not (x != x and y != y):
+            return False
+    return True
+
+
+class HistoryStore:
+
+    def __init__(self, directory=HISTORY_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self.stats = {"facts_written": 0, "revisions": 0, "unchanged": 0}
+
+    def _dir(self, company_url, mode):
+        return os.path.join(self.directory, company_key(company_url), mode.lower())
+
+    def _files(self, directory, prefix):
+        try:
+            files = [
+                os.path.join(directory, f) for f in os.listdir(directory)
+                if f.startswith(prefix) and f.endswith(".parquet")
+            ]
+        except OSError:
+            return []
+        # numeric: the sequence outgrows any fixed width
+        return sorted(files, key=lambda f: (_seq(f), f))
+
+    # ------------------------------
+    # Reading
+    # ------------------------------
+    def read_facts(self, company_url, mode, sections=None, start=None, end=None):
+        with _dir_lock(self._dir(company_url, mode), shared=True):
+            return self._read_facts(company_url, mode, sections, start, end)
+
+    def _read_facts(self, company_url, mode, sections=None, start=None, end=None):
+
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        files = self._files(self._dir(company_url, mode), "part-")
+        if not files:
+            return _schema().empty_table()
+
+        table = pa.concat_tables([pq.read_table(f, schema=_schema()) for f in files])
+
+        mask = None
+
+        def both(m, cond):
+            return cond if m is None else pc.and_(m, cond)
+
+        if sections is not None:
+            mask = both(mask, pc.is_in(table["section"], value_set=pa.array(list(sections), pa.string())))
+
+        # start / end: pd.Period or "Mar 2024"; non-period columns are kept
+        for bound, op in ((start, pc.greater_equal), (end, pc.less_equal)):
+            if bound is None:
+                continue
+            ordinal = _period_ord(_as_period(bound))
+            cond = pc.or_kleene(op(table["period_ord"], ordinal), pc.is_null(table["period_ord"]))
+            mask = both(mask, cond)
+
+        if mask is not None:
+            table = table.filter(mask)
+
+        return table
+
+    def read(self, company_url, mode, sections=None, start=None, end=None):
+
+        facts = self.read_facts(company_url, mode, sections, start, end).to_pandas()
+        if facts.empty:
+            return {}
+
+        # newest fact per key wins (part files are read in sequence order)
+        facts = facts.drop_duplicates(_KEY, keep="last")
+
+        result = {}
+        for section, group in facts.groupby("section", sort=False):
+            result[section] = _facts_to_table(group)
+
+        return result
+
+    # ------------------------------
+    # Merging a scrape
+    # ------------------------------
+    def append(self, company_url, mode, tables, scraped_at=None):
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        scraped_at = int(scraped_at or time.time())
+
+        facts = []
+        for section, df in tables.items():
+            facts.extend(table_to_facts(section, df, scraped_at))
+
+        if not facts:
+            return {"new": 0, "revised": 0, "unchanged": 0}
+
+        directory = self._dir(company_url, mode)
+
+        with self._lock, _dir_lock(directory):
+
+            known = {}
+            existing = self._read_facts(company_url, mode, sections={f["section"] for f in facts})
+            for fact in existing.select(_KEY + ["value", "text", "link", "scraped_at"]).to_pylist():
+                known[tuple(fact[k] for k in _KEY)] = fact
+
+            fresh, revisions = [], []
+            unchanged = 0
+
+            for fact in facts:
+                key = tuple(fact[k] for k in _KEY)
+                old = known.get(key)
+
+                if old is None:
+                    fresh.append(fact)
+                elif not _same(old, fact):
+                    fresh.append(fact)
+                    revisions.append({
+                        "section": fact["section"],
+                        "label": fact["label"],
+                        "occurrence": fact["occurrence"],
+                        "period": fact["period"],
+                        "old_value": old["value"],
+                        "new_value": fact["value"],
+                        "old_text": old["text"],
+                        "new_text": fact["text"],
+                        "old_scraped_at": old["scraped_at"],
+                        "scraped_at": scraped_at,
+                    })
+                else:
+                    unchanged += 1
+
+            if fresh:
+                os.makedirs(directory, exist_ok=True)
+                parts = self._files(directory, "part-")
+                seq = max((_seq(f) for f in parts), default=0) + 1
+                stamp = f"{seq:010d}-{os.getpid()}"
+
+                part = pa.Table.from_pylist(fresh, schema=_schema())
+                _write_atomic(pq, part, os.path.join(directory, f"part-{stamp}.parquet"))
+
+                if revisions:
+                    rev = pa.Table.from_pylist(revisions)
+                    _write_atomic(pq, rev, os.path.join(directory, f"revisions-{stamp}.parquet"))
+
+                if len(parts) + 1 > HISTORY_COMPACT_PARTS:
+                    self._compact(company_url, mode)
+
+            new = len(fresh) - len(revisions)
+            self.stats["facts_written"] += len(fresh)
+            self.stats["revisions"] += len(revisions)
+            self.stats["unchanged"] += unchanged
+
+        return {"new": new, "revised": len(revisions), "unchanged": unchanged}
+
+    def revisions(self, company_url, mode):
+
+        import pandas as pd
+        import pyarrow.parquet as pq
+
+        files = self._files(self._dir(company_url, mode), "revisions-")
+        if not files:
+            return pd.DataFrame()
+
+        return pd.concat([pq.read_table(f).to_pandas() for f in files], ignore_index=True)
+
+    def compact(self, company_url, mode):
+        with self._lock, _dir_lock(self._dir(company_url, mode)):
+            self._compact(company_url, mode)
+
+    def _compact(self, company_url, mode):
+
+        # fold all part files into one (latest facts only); revisions stay
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        directory = self._dir(company_url, mode)
+        files = self._files(directory, "part-")
+        if len(files) < 2:
+            return
+
+        facts = self._read_facts(company_url, mode).to_pandas().drop_duplicates(_KEY, keep="last")
+        table = pa.Table.from_pandas(facts, schema=_schema(), preserve_index=False)
+
+        # takes the sequence number of the newest part it replaces, so it
+        # still sorts before anything appended after it
+        path = os.path.join(directory, f"part-{_seq(files[-1]):010d}-compacted.parquet")
+        _write_atomic(pq, table, path)
+        for f in files:
+            if f != path:
+                os.remove(f)
+
+
+def _write_atomic(pq, table, path):
+
+    tmp = f"{path}.tmp"
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, path)
+
+
+def _as_period(value):
+
+    import pandas as pd
+
+    from normalize import parse_period
+
+    if isinstance(value, pd.Period):
+        return value
+
+    period = parse_period(value)
+    if not isinstance(period, pd.Period):
+        raise ValueError(f"Not a period label: {value!r}")
+
+    return period
+
+
+def _facts_to_table(facts):
+
+    import numpy as np
+    import pandas as pd
+
+    from normalize import parse_period
+
+    # columns: periods in time order, then the rest in their scraped order
+    columns = facts.drop_duplicates("period")[["period", "period_ord", "column"]]
+    columns = columns.sort_values(["period_ord", "column"], na_position="last")
+    periods = list(columns["period"])
+
+    # rows in the order of the most recent scrape that had them
+    rows = (
+        facts.sort_values("scraped_at")
+        .drop_duplicates(["label", "occurrence"], keep="last")
+        .sort_values("row")
+    )
+    row_index = {(r.label, r.occurrence): i for i, r in enumerate(rows.itertuples(index=False))}
+    col_index = {p: i for i, p in enumerate(periods)}
+
+    has_text = facts["text"].notna().groupby(facts["period"]).any().to_dict()
+
+    data = {}
+    for p in periods:
+        if has_text.get(p):
+            data[p] = np.full(len(rows), None, dtype=object)
+        else:
+            data[p] = np.full(len(rows), np.nan)
+
+    # row styling comes from the latest scrape of that row
+    percent_rows = {i for i, flag in enumerate(rows["percent"]) if flag}
+    bold_rows = {i for i, flag in enumerate(rows["bold"]) if flag}
+    links = {}
+
+    for f in facts.itertuples(index=False):
+        r = row_index[(f.label, f.occurrence)]
+        column = data[f.period]
+        # nulls come back from Parquet as NaN, not None
+        column[r] = f.text if column.dtype == object and pd.notna(f.text) else f.value
+        if pd.notna(f.link):
+            links.setdefault(r, {})[col_index[f.period] + 1] = f.link
+
+    label_header = facts["label_header"].iloc[-1]
+    out = pd.DataFrame({label_header: list(rows["label"]), **data})
+    out.columns = [label_header] + [parse_period(p) for p in periods]
+
+    out.attrs["percent_rows"] = percent_rows
+    out.attrs["bold_rows"] = bold_rows
+    out.attrs["links"] = links
+
+    return out
+
+
+# ------------------------------
+# Process-wide store
+# ------------------------------
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store():
+
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = HistoryStore()
+
+    return _store
@@ -0,0 +1,288 @@
+import contextvars
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from outbound import get_outbound
+
+# ------------------------------
+# Browser-free Screener engine
+#
+# Screener ships every statement table in the static page; the "+" rows are
+# filled in by Company.showSchedule(), which calls a JSON schedules API, and
+# the peer table is loaded from a separate HTML fragment. Replaying those
+# calls over pooled HTTP gives the same expanded tables without Chromium.
+# Anything that does not look like that layout raises LayoutNotSupported so
+# the caller can fall back to the browser engine (as it does for failed
+# requests, in "auto" mode).
+# ------------------------------
+
+SCREENER_BASE_URL = os.environ.get("FINXTRACT_SCREENER_BASE_URL", "https://www.screener.in")
+HTTP_WORKERS = int(os.environ.get("FINXTRACT_HTTP_WORKERS", "8"))
+
+_SHOW_SCHEDULE = re.compile(
+    r"Company\.showSchedule\(\s*'((?:[^'\\]|\\.)*)'\s*,\s*'([^']*)'"
+)
+
+_SECTION_TABLES = "//h2/following::table[1] | //h3/following::table[1]"
+
+
+class LayoutNotSupported(Exception):
+    pass
+
+
+def _cell_text(value):
+
+    # what the page's own JS writes into the cell: numbers as JS prints
+    # them (52.0 -> "52"), null as an empty cell
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def _is_expander(button):
+
+    for span in button.iter("span"):
+        classes = (span.get("class") or "").split()
+        if "blue-icon" in classes and (span.text or "").strip() in ("+", ">"):
+            return span
+
+    return None
+
+
+class ScreenerHttpEngine:
+
+    def __init__(self, base_url=SCREENER_BASE_URL, workers=HTTP_WORKERS, timeout=20):
+        self.base_url = base_url.rstrip("/")
+        self.workers = workers
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            "User-Agent": "Mozilla/5.0",
+            "Accept-Language": "en-US,en;q=0.9",
+        })
+
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(workers, 4))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="finxtract-http")
+
+    def _url(self, url_or_path):
+
+        # company URLs come in as absolute screener.in URLs; re-home them
+        # on base_url so the engine can be pointed at a fixture server
+        parts = urlsplit(url_or_path)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        return self.base_url + path
+
+    def _get(self, url_or_path, **kwargs):
+
+        r = get_outbound().request(
+            self.session.get, self._url(url_or_path), timeout=self.timeout, **kwargs
+        )
+        r.raise_for_status()
+        metrics.count("requests")
+        metrics.count("bytes_downloaded", len(r.content))
+        return r
+
+    def _submit(self, fn, *args):
+        # carry the caller's metrics span into the worker thread
+        return self._executor.submit(contextvars.copy_context().run, fn, *args)
+
+    # ------------------------------
+    # Schedules ("+" rows)
+    # ------------------------------
+    def _fetch_schedule(self, company_id, parent, section, consolidated):
+
+        r = self._get(
+            f"/api/company/{company_id}/schedules/",
+            params={
+                "parent": parent,
+                "section": section,
+                "consolidated": "true" if consolidated else "",
+            },
+        )
+
+        try:
+            data = r.json()
+        except ValueError:
+            raise LayoutNotSupported(f"schedule {section}/{parent} is not JSON")
+
+        if not isinstance(data, dict):
+            raise LayoutNotSupported(f"schedule {section}/{parent} is not an object")
+
+        for name, values in data.items():
+            if not isinstance(values, dict) or any(
+                isinstance(v, (dict, list)) for v in values.values()
+            ):
+                # nested schedules need the real page JS
+                raise LayoutNotSupported(f"schedule {section}/{parent} row {name!r} is nested")
+
+        return data
+
+    def _expand_tables(self, doc, company_id, consolidated):
+
+        from lxml import etree
+
+        jobs = []
+
+        for table in doc.xpath(_SECTION_TABLES):
+
+            header = [
+                " ".join(th.text_content().split())
+                for th in table.xpath(".//tr[1]/th")
+            ]
+
+            for button in table.xpath(".//button"):
+
+                span = _is_expander(button)
+                if span is None:
+                    continue
+
+                m = _SHOW_SCHEDULE.search(button.get("onclick") or "")
+                if not m:
+                    raise LayoutNotSupported("expander without a showSchedule() hook")
+
+                parent = m.group(1).replace("\\'", "'")
+                section = m.group(2)
+                row = next(button.iterancestors("tr"), None)
+                if row is None:
+                    raise LayoutNotSupported("expander outside a table row")
+
+                future = self._submit(
+                    self._fetch_schedule, company_id, parent, section, consolidated
+                )
+                jobs.append((row, span, header, future))
+
+        expanded = 0
+
+        for row, span, header, future in jobs:
+
+            schedule = future.result()
+            anchor = row
+
+            for name, values in schedule.items():
+
+                tr = etree.SubElement(row.getparent(), "tr")
+                tr.set("class", "finxtract-schedule")
+
+                td = etree.SubElement(tr, "td")
+                td.set("class", "text")
+                td.text = name
+
+                for period in header[1:]:
+                    td = etree.SubElement(tr, "td")
+                    td.text = _cell_text(values.get(period))
+
+                # SubElement appends at the end; move right under the parent row
+                anchor.addnext(tr)
+                anchor = tr
+                expanded += 1
+
+            span.text = "-"
+
+        return expanded
+
+    # ------------------------------
+    # Peer comparison fragment
+    # ------------------------------
+    def _fetch_peers(self, warehouse_id):
+        return self._get(f"/api/company/{warehouse_id}/peers/").text
+
+    def _insert_peers(self, doc, fragment_html):
+
+        import lxml.html
+
+        placeholder = doc.xpath("//*[@id='peers-table-placeholder']")
+        if not placeholder:
+            raise LayoutNotSupported("no peers-table-placeholder")
+
+        fragments = [
+            f for f in lxml.html.fragments_fromstring(fragment_html)
+            if not isinstance(f, str)
+        ]
+
+        if not any(f.tag == "table" or f.xpath(".//table") for f in fragments):
+            raise LayoutNotSupported("peers fragment has no table")
+
+        target = placeholder[0]
+        for child in list(target):
+            target.remove(child)
+        target.text = None
+
+        for f in fragments:
+            target.append(f)
+
+    # ------------------------------
+    # Public API
+    # ------------------------------
+    def fetch_snapshots(self, company_url, on_stage=None):
+
+        import lxml.html
+
+        page = self._get(company_url)
+        doc = lxml.html.document_fromstring(page.text)
+
+        info = doc.xpath("//*[@id='company-info']")
+        if not info or not info[0].get("data-company-id"):
+            raise LayoutNotSupported("no #company-info company id")
+
+        company_id = info[0].get("data-company-id")
+        warehouse_id = info[0].get("data-warehouse-id")
+        if not warehouse_id:
+            raise LayoutNotSupported("no #company-info warehouse id")
+
+        consolidated = company_url.rstrip("/").endswith("/consolidated")
+
+        if not doc.xpath("//h2[normalize-space()='Peer comparison']"):
+            raise LayoutNotSupported("no Peer comparison section")
+
+        # fetch peers alongside the schedules, but only ever touch the
+        # tree from this thread
+        peers = self._submit(self._fetch_peers, warehouse_id)
+
+        if on_stage is not None:
+            on_stage("expand")
+        expanded = self._expand_tables(doc, company_id, consolidated)
+        self._insert_peers(doc, peers.result())
+
+        metrics.count("rows_expanded", expanded)
+        print(f"--- HTTP engine expanded {expanded} rows:", company_url)
+
+        # the static page carries both the quarterly and yearly shareholding
+        # tables, so one document serves as both snapshots
+        html = lxml.html.tostring(doc, encoding="unicode")
+        return html, html
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+
+# ------------------------------
+# Process-wide engine
+# ------------------------------
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_http_engine():
+
+    global _engine
+
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = ScreenerHttpEngine()
+
+    return _engine
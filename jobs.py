@@ -0,0 +1,204 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from scraper import (
+    SCRAPE_STAGES,
+    fetch_screener_snapshots,
+    iter_parsed_sections,
+    resolve_company_url,
+)
+from worker_client import get_worker_client
+
+# ------------------------------
+# Background scrape jobs
+#
+# The UI submits a scrape and gets a job id back right away; the scrape
+# runs on a worker thread and publishes its stage and every parsed section
+# as soon as it is ready, so the page can draw tables while the rest of
+# the company is still being parsed / patched.
+#
+# With FINXTRACT_WORKER_URL set the thread only waits on the worker
+# service; sections then arrive together when the remote scrape is done.
+# ------------------------------
+
+JOB_WORKERS = int(os.environ.get("FINXTRACT_JOB_WORKERS", "4"))
+JOB_HISTORY = 50      # finished jobs kept around for late readers
+
+
+class ScrapeJob:
+
+    def __init__(self, company_name, mode):
+        self.id = uuid.uuid4().hex
+        self.company_name = company_name
+        self.mode = mode
+
+        self.status = "queued"        # queued / running / done / error
+        self.stage = None
+        self.stage_started = {}
+        self.company_url = None
+        self.error = None
+        self.trace = None             # metrics.Trace, complete once done
+
+        self.submitted = time.time()
+        self.first_section_at = None
+        self.finished = None
+
+        self._sections = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ------------------------------
+    # Written by the worker
+    # ------------------------------
+    def set_stage(self, stage):
+        with self._lock:
+            self.stage = stage
+            self.stage_started.setdefault(stage, time.time())
+
+    def add_section(self, key, df):
+        with self._lock:
+            self._sections[key] = df
+            if self.first_section_at is None:
+                self.first_section_at = time.time()
+
+    def finish(self, error=None):
+        with self._lock:
+            self.error = error
+            self.status = "error" if error else "done"
+            self.finished = time.time()
+
+    # ------------------------------
+    # Read by the UI
+    # ------------------------------
+    @property
+    def done(self):
+        return self.status in ("done", "error")
+
+    def sections(self):
+        with self._lock:
+            return OrderedDict(self._sections)
+
+    def progress(self):
+
+        # fraction of the stage list reached (0..1)
+        with self._lock:
+            if self.done:
+                return 1.0
+            if self.stage not in SCRAPE_STAGES:
+                return 0.0
+            return SCRAPE_STAGES.index(self.stage) / len(SCRAPE_STAGES)
+
+    def elapsed(self):
+        return round((self.finished or time.time()) - self.submitted, 2)
+
+    def __repr__(self):
+        return f"<ScrapeJob {self.id[:8]} {self.company_name!r} {self.status} stage={self.stage}>"
+
+
+def _run_remote(job, client):
+
+    job.set_stage("search")
+    company_url = client.resolve_company_url(job.company_name, job.mode)
+    if not company_url:
+        raise LookupError(f"No Screener company found for {job.company_name!r}")
+
+    job.company_url = company_url
+
+    job.set_stage("render")
+    _, tables = client.scrape(mode=job.mode, company_url=company_url)
+
+    job.set_stage("parse")
+    for key, df in tables.items():
+        job.add_section(key, df)
+
+
+def _run_local(job):
+
+    job.set_stage("search")
+    company_url = resolve_company_url(job.company_name, job.mode)
+    if not company_url:
+        raise LookupError(f"No Screener company found for {job.company_name!r}")
+
+    job.company_url = company_url
+
+    html_periodic, html_yearly = fetch_screener_snapshots(
+        company_url, job.mode, on_stage=job.set_stage
+    )
+
+    for key, df in iter_parsed_sections(
+        html_periodic,
+        html_yearly,
+        change_key=(company_url, job.mode),
+        on_stage=job.set_stage,
+    ):
+        job.add_section(key, df)
+
+
+def _run_job(job):
+
+    job.status = "running"
+
+    try:
+        with metrics.trace("ui scrape", company=job.company_name, mode=job.mode) as trace:
+            job.trace = trace
+            client = get_worker_client()
+            if client is not None:
+                _run_remote(job, client)
+            else:
+                _run_local(job)
+
+    except Exception as e:
+        job.finish(f"{type(e).__name__}: {e}")
+        return
+
+    job.finish()
+
+
+class JobRunner:
+
+    def __init__(self, workers=JOB_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="finxtract-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, company_name, mode):
+
+        job = ScrapeJob(company_name, mode)
+
+        with self._lock:
+            self._jobs[job.id] = job
+
+            # forget the oldest finished jobs
+            finished = [j.id for j in self._jobs.values() if j.done]
+            for job_id in finished[:max(0, len(finished) - JOB_HISTORY)]:
+                del self._jobs[job_id]
+
+        self._executor.submit(_run_job, job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+
+# ------------------------------
+# Process-wide runner
+# ------------------------------
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner():
+
+    global _runner
+
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = JobRunner()
+
+    return _runner
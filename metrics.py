@@ -0,0 +1,439 @@
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+# ------------------------------
+# Stage timings and counters for the scrape pipeline
+#
+#   with metrics.trace("scrape", company=name, mode=mode):
+#       with metrics.span("search") as s:
+#           ...
+#           s.count("api_calls")
+#
+# A trace is one request (UI job, batch entry, worker call); spans inside it
+# are the stages (search, goto, expand, parse, peer patch, excel export...).
+# The current trace / span live in contextvars, so nested spans, asyncio
+# tasks and browser-pool coroutines (see BrowserPool.submit) attach to the
+# right request without passing anything around.
+#
+# Every finished span also feeds a process-wide registry:
+#   finxtract_stage_seconds{stage}            histogram (latency SLOs)
+#   finxtract_stage_errors_total{stage}
+#   finxtract_stage_events_total{stage,event} counts (clicks, rows, hits...)
+# exposed in Prometheus text format on FINXTRACT_METRICS_PORT (/metrics)
+# together with outbound host and browser pool state (BrowserPool.health),
+# and finished traces are written as JSON lines to FINXTRACT_METRICS_LOG
+# ("-" for stdout).
+# ------------------------------
+
+METRICS_LOG = os.environ.get("FINXTRACT_METRICS_LOG", "")
+METRICS_HOST = os.environ.get("FINXTRACT_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("FINXTRACT_METRICS_PORT", "0"))
+RECENT_TRACES = 50
+
+# seconds; covers a cached hit (ms) up to a cold browser scrape (minutes)
+BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60, 120, 300)
+
+_trace = contextvars.ContextVar("finxtract_trace", default=None)
+_span = contextvars.ContextVar("finxtract_span", default=None)
+
+
+class Span:
+
+    __slots__ = ("name", "parent", "start", "duration", "counts", "attrs", "error", "_lock")
+
+    def __init__(self, name, parent, attrs):
+        self.name = name
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.duration = None
+        self.counts = {}
+        self.attrs = attrs
+        self.error = None
+        self._lock = threading.Lock()
+
+    def count(self, event, n=1):
+        # worker threads (HTTP engine schedules) count into the same span
+        with self._lock:
+            self.counts[event] = self.counts.get(event, 0) + n
+
+    def set(self, key, value):
+        self.attrs[key] = value
+
+    def to_dict(self, t0):
+        return {
+            "name": self.name,
+            "parent": self.parent,
+            "start_ms": round((self.start - t0) * 1000, 1),
+            "ms": None if self.duration is None else round(self.duration * 1000, 1),
+            "counts": dict(self.counts),
+            "attrs": dict(self.attrs),
+            "error": self.error,
+        }
+
+
+class Trace:
+
+    def __init__(self, name, attrs):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.error = None
+
+        self._spans = []
+        self._remote = []
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self._spans.append(span)
+
+    def add_remote(self, spans):
+        # spans recorded in another process (worker service)
+        with self._lock:
+            self._remote.extend(spans)
+
+    def to_dict(self):
+
+        with self._lock:
+            spans = [s.to_dict(self.start) for s in self._spans] + list(self._remote)
+
+        spans.sort(key=lambda s: s["start_ms"])
+        return {
+            "trace": self.id,
+            "name": self.name,
+            "attrs": dict(self.attrs),
+            "started_at": round(self.started_at, 3),
+            "ms": None if self.duration is None else round(self.duration * 1000, 1),
+            "error": self.error,
+            "spans": spans,
+        }
+
+
+# ------------------------------
+# Registry (Prometheus text format)
+# ------------------------------
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    inner = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+    return "{" + inner + "}" if inner else ""
+
+
+class Registry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}       # stage -> [bucket counts..., sum, count]
+        self._errors = {}
+        self._events = {}
+        self._traces = {}       # trace name -> [bucket counts..., sum, count]
+        self.recent = deque(maxlen=RECENT_TRACES)
+
+    @staticmethod
+    def _observe(table, key, seconds):
+        row = table.get(key)
+        if row is None:
+            row = table[key] = [0] * (len(BUCKETS) + 2)
+        for i, le in enumerate(BUCKETS):
+            if seconds <= le:
+                row[i] += 1
+        row[-2] += seconds
+        row[-1] += 1
+
+    def observe_span(self, name, seconds, counts=None, error=None):
+        with self._lock:
+            self._observe(self._stages, name, seconds)
+            if error:
+                self._errors[name] = self._errors.get(name, 0) + 1
+            for event, n in (counts or {}).items():
+                self._events[(name, event)] = self._events.get((name, event), 0) + n
+
+    def observe_trace(self, trace_dict):
+        with self._lock:
+            if trace_dict["ms"] is not None:
+                self._observe(self._traces, trace_dict["name"], trace_dict["ms"] / 1000)
+            self.recent.append(trace_dict)
+
+    def _histogram(self, lines, metric, label, table):
+        lines.append(f"# TYPE {metric} histogram")
+        for key, row in sorted(table.items()):
+            for i, le in enumerate(BUCKETS):
+                lines.append(f"{metric}_bucket{_labels(**{label: key, 'le': le})} {row[i]}")
+            lines.append(f"{metric}_bucket{_labels(**{label: key, 'le': '+Inf'})} {row[-1]}")
+            lines.append(f"{metric}_sum{_labels(**{label: key})} {row[-2]:.6f}")
+            lines.append(f"{metric}_count{_labels(**{label: key})} {row[-1]}")
+
+    def render(self):
+
+        lines = []
+
+        with self._lock:
+            self._histogram(lines, "finxtract_stage_seconds", "stage", self._stages)
+            self._histogram(lines, "finxtract_request_seconds", "name", self._traces)
+
+            lines.append("# TYPE finxtract_stage_errors_total counter")
+            for stage, n in sorted(self._errors.items()):
+                lines.append(f"finxtract_stage_errors_total{_labels(stage=stage)} {n}")
+
+            lines.append("# TYPE finxtract_stage_events_total counter")
+            for (stage, event), n in sorted(self._events.items()):
+                lines.append(f"finxtract_stage_events_total{_labels(stage=stage, event=event)} {n}")
+
+        # outbound scheduler state, if anything went out from this process
+        outbound = sys.modules.get("outbound")
+        if outbound is not None:
+            hosts = outbound.get_outbound().summary()
+            for metric, field, kind in (
+                ("finxtract_outbound_requests_total", "requests", "counter"),
+                ("finxtract_outbound_retries_total", "retries", "counter"),
+                ("finxtract_outbound_throttled_total", "throttled", "counter"),
+                ("finxtract_outbound_waited_total", "waited", "counter"),
+                ("finxtract_outbound_wait_seconds_total", "wait_s", "counter"),
+                ("finxtract_outbound_breaker_trips_total", "breaker_trips", "counter"),
+                ("finxtract_outbound_rate", "rate", "gauge"),
+            ):
+                lines.append(f"# TYPE {metric} {kind}")
+                for host, s in sorted(hosts.items()):
+                    lines.append(f"{metric}{_labels(host=host)} {s[field]}")
+
+            lines.append("# TYPE finxtract_outbound_latency_ms gauge")
+            for host, s in sorted(hosts.items()):
+                for q in ("p50", "p90", "p99"):
+                    if s[f"{q}_ms"] is not None:
+                        lines.append(
+                            f"finxtract_outbound_latency_ms{_labels(host=host, quantile=q)} {s[f'{q}_ms']}"
+                        )
+
+        # NSE quote cache, if this process has looked up live prices
+        nse_client = sys.modules.get("nse_client")
+        if nse_client is not None and nse_client._client is not None:
+            nse = nse_client._client.summary()
+            for metric, field in (
+                ("finxtract_nse_quote_hits_total", "hits"),
+                ("finxtract_nse_quote_misses_total", "misses"),
+                ("finxtract_nse_quote_coalesced_total", "coalesced"),
+                ("finxtract_nse_upstream_calls_total", "upstream_calls"),
+                ("finxtract_nse_throttled_total", "throttled"),
+                ("finxtract_nse_throttle_wait_seconds_total", "throttle_wait_s"),
+            ):
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {nse[field]}")
+
+        # browser pool state, if this process renders pages
+        if sys.modules.get("browser_pool") is not None:
+            health = sys.modules["browser_pool"].get_browser_pool().health()
+            for metric, field in (
+                ("finxtract_browser_active_contexts", "active_contexts"),
+                ("finxtract_browser_pages_served", "pages_served"),
+                ("finxtract_browser_launches", "launches"),
+                ("finxtract_browser_rss_mb", "rss_mb"),
+            ):
+                lines.append(f"# TYPE {metric} gauge")
+                for slot in health["slots"]:
+                    if slot[field] is not None:
+                        lines.append(f"{metric}{_labels(slot=slot['slot'])} {slot[field]}")
+
+            lines.append("# TYPE finxtract_browser_recycled_total counter")
+            for reason in ("recycled_page_limit", "recycled_memory", "relaunched_unhealthy"):
+                lines.append(
+                    f"finxtract_browser_recycled_total{_labels(reason=reason)} {health[reason]}"
+                )
+
+        return "\n".join(lines) + "\n"
+
+
+_registry = Registry()
+
+
+def get_registry():
+    return _registry
+
+
+# ------------------------------
+# Spans / traces
+# ------------------------------
+def current_trace():
+    return _trace.get()
+
+
+@contextmanager
+def span(name, **attrs):
+
+    trace = _trace.get()
+    parent = _span.get()
+    s = Span(name, parent.name if parent is not None else None, attrs)
+    token = _span.set(s)
+
+    try:
+        yield s
+    except BaseException as e:
+        s.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _span.reset(token)
+        s.duration = time.perf_counter() - s.start
+        if trace is not None:
+            trace.add(s)
+        _registry.observe_span(name, s.duration, s.counts, s.error)
+
+
+def record(name, seconds, counts=None, **attrs):
+
+    # a span measured by hand, for code that cannot hold a `with` open
+    # (generators that yield between the pieces of work)
+    parent = _span.get()
+    s = Span(name, parent.name if parent is not None else None, attrs)
+    s.start -= seconds
+    s.duration = seconds
+    s.counts = dict(counts or {})
+
+    trace = _trace.get()
+    if trace is not None:
+        trace.add(s)
+    _registry.observe_span(name, seconds, s.counts)
+
+
+def count(event, n=1):
+
+    # counts on the innermost open span (no-op outside one)
+    s = _span.get()
+    if s is not None:
+        s.count(event, n)
+
+
+@contextmanager
+def trace(name, **attrs):
+
+    t = Trace(name, attrs)
+    token = _trace.set(t)
+    span_token = _span.set(None)
+
+    try:
+        yield t
+    except BaseException as e:
+        t.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _span.reset(span_token)
+        _trace.reset(token)
+        t.duration = time.perf_counter() - t.start
+        finish_trace(t.to_dict())
+
+
+def finish_trace(trace_dict):
+    _registry.observe_trace(trace_dict)
+    _log(trace_dict)
+
+
+def replay_spans(spans):
+
+    # spans that ran in a worker process: count them here and attach them
+    # to the current trace so the UI panel still sees every stage
+    for s in spans:
+        if s["ms"] is not None:
+            _registry.observe_span(s["name"], s["ms"] / 1000, s["counts"], s["error"])
+
+    t = _trace.get()
+    if t is not None:
+        t.add_remote(spans)
+
+
+_log_lock = threading.Lock()
+
+
+def _log(trace_dict):
+
+    if not METRICS_LOG:
+        return
+
+    line = json.dumps(trace_dict, separators=(",", ":"), default=str)
+
+    with _log_lock:
+        if METRICS_LOG == "-":
+            print(line, flush=True)
+        else:
+            with open(METRICS_LOG, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def stage_totals(trace_dict):
+
+    # time per stage name for the UI panel / batch manifest; a nested stage
+    # (http engine inside fetch) is also part of its parent's time
+    totals = {}
+    for s in trace_dict["spans"]:
+        if s["ms"] is None:
+            continue
+        row = totals.setdefault(s["name"], {"ms": 0.0, "calls": 0, "counts": {}})
+        row["ms"] += s["ms"]
+        row["calls"] += 1
+        for event, n in s["counts"].items():
+            row["counts"][event] = row["counts"].get(event, 0) + n
+    return totals
+
+
+# ------------------------------
+# /metrics endpoint
+# ------------------------------
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+
+    # idempotent; port 0 (the default) means no endpoint
+    global _server
+
+    if not port:
+        return None
+
+    # http.server only when an endpoint is wanted (keeps imports light)
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+
+            if self.path == "/metrics":
+                body = _registry.render().encode("utf-8")
+                content_type = "text/plain; version=0.0.4"
+            elif self.path == "/traces":
+                body = json.dumps(list(_registry.recent), default=str).encode("utf-8")
+                content_type = "application/json"
+            else:
+                self.send_response(404)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    if _server is None:
+        with _server_lock:
+            if _server is None:
+                server = ThreadingHTTPServer((host, port), MetricsHandler)
+                server.daemon_threads = True
+                threading.Thread(
+                    target=server.serve_forever, name="finxtract-metrics", daemon=True
+                ).start()
+                _server = server
+
+    return _server
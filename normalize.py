@@ -0,0 +1,160 @@
+import math
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# ------------------------------
+# Typed, compact section tables
+#
+# Parsed tables come out of the HTML as object columns full of "1,234",
+# "12%" and "". This turns every value column that is numeric into a real
+# float column (NaN for blanks), turns "Mar 2024" style headers into
+# monthly Periods and keeps the few display-only bits on df.attrs:
+#   attrs["percent_rows"]  row positions whose values were written as "x%"
+#   attrs["links"]         {row position: {column position: url}} (Raw PDF)
+# ------------------------------
+
+FLOAT_DTYPE = os.environ.get("FINXTRACT_FLOAT_DTYPE", "float64")
+
+_MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+_PERIOD_HEADER = re.compile(r"^([A-Za-z]{3})\s+(\d{4})$")
+_BLANKS = {"", "-", "--", "—", "nan", "none"}
+
+
+class _NotNumeric(Exception):
+    pass
+
+
+def parse_period(label):
+
+    if isinstance(label, pd.Period):
+        return label
+
+    m = _PERIOD_HEADER.match(str(label).strip())
+    if not m or m.group(1).lower() not in _MONTHS:
+        return label
+
+    return pd.Period(year=int(m.group(2)), month=_MONTHS[m.group(1).lower()], freq="M")
+
+
+def period_label(label):
+
+    if isinstance(label, pd.Period):
+        return label.strftime("%b %Y")
+
+    return str(label)
+
+
+def _parse_number(v):
+
+    # returns (value, is_percent)
+    if v is None:
+        return math.nan, False
+
+    if isinstance(v, (int, float, np.integer, np.floating)) and not isinstance(v, bool):
+        return float(v), False
+
+    s = str(v).strip()
+    if s.lower() in _BLANKS:
+        return math.nan, False
+
+    percent = s.endswith("%")
+    if percent:
+        s = s[:-1].strip()
+
+    try:
+        return float(s.replace(",", "")), percent
+    except ValueError:
+        raise _NotNumeric(v)
+
+
+def normalize_financial_table(df, float_dtype=FLOAT_DTYPE):
+
+    if df.shape[1] < 2:
+        return df
+
+    labels = df.iloc[:, 0]
+
+    # ---------- pull Raw PDF links out of the value grid
+    links = {}
+    link_rows = set()
+
+    for pos, label in enumerate(labels):
+        if isinstance(label, str) and label.strip().lower() == "raw pdf":
+            link_rows.add(pos)
+            row_links = {}
+            for col in range(1, df.shape[1]):
+                v = df.iat[pos, col]
+                if isinstance(v, str) and v.startswith("http"):
+                    row_links[col] = v
+            if row_links:
+                links[pos] = row_links
+
+    # ---------- value columns -> float where every cell is numeric
+    columns = {df.columns[0]: labels}
+    percent_rows = set()
+
+    for col in range(1, df.shape[1]):
+
+        values = df.iloc[:, col]
+
+        if values.dtype.kind in "iuf":
+            columns[df.columns[col]] = values.to_numpy(dtype=float_dtype)
+            continue
+
+        parsed = np.empty(len(values), dtype=float_dtype)
+        col_percent = []
+
+        try:
+            for pos, v in enumerate(values):
+                if pos in link_rows:
+                    parsed[pos] = np.nan
+                    continue
+                parsed[pos], is_percent = _parse_number(v)
+                if is_percent:
+                    col_percent.append(pos)
+        except _NotNumeric:
+            # text column (e.g. peer names): keep as-is, minus the links
+            kept = values.to_numpy(dtype=object, copy=True)
+            for pos in link_rows:
+                kept[pos] = None
+            columns[df.columns[col]] = kept
+            continue
+
+        columns[df.columns[col]] = parsed
+        percent_rows.update(col_percent)
+
+    out = pd.DataFrame(columns, index=df.index)
+    out.columns = [df.columns[0]] + [parse_period(c) for c in df.columns[1:]]
+
+    out.attrs = dict(df.attrs)
+    out.attrs["percent_rows"] = percent_rows
+    out.attrs["links"] = links
+
+    return out
+
+
+# ------------------------------
+# Back to display values
+# ------------------------------
+def format_value(v, percent=False):
+
+    if v is None:
+        return ""
+
+    if isinstance(v, (float, np.floating)):
+        if math.isnan(v):
+            return ""
+        v = float(v)
+        # fixed decimals: :g would turn 1234567.5 into 1.23457e+06
+        text = str(int(v)) if v.is_integer() else f"{v:.2f}".rstrip("0").rstrip(".")
+        if text == "-0":
+            text = "0"
+        return text + "%" if percent else text
+
+    return str(v)
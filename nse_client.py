@@ -0,0 +1,277 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from concurrency import SingleFlight
+from outbound import get_outbound
+
+# ------------------------------
+# NSE quote client
+#
+# NSE only serves the quote API to sessions that carry the cookies set by
+# its homepage. One warmed session is shared by every lookup and re-warmed
+# only when its cookies expire (or NSE starts refusing us); quotes for a
+# whole peer table are fetched concurrently on a bounded worker pool.
+#
+# Quotes are cached per symbol for a few seconds and shared by every user
+# and peer table in the process; concurrent misses for one symbol make a
+# single upstream call. Every call to NSE goes through the outbound
+# scheduler (rate limit, backoff / retries, circuit breaker).
+# ------------------------------
+
+NSE_BASE_URL = "https://www.nseindia.com"
+NSE_WORKERS = int(os.environ.get("FINXTRACT_NSE_WORKERS", "8"))
+NSE_TIMEOUT = float(os.environ.get("FINXTRACT_NSE_TIMEOUT", "10"))
+NSE_COOKIE_TTL = int(os.environ.get("FINXTRACT_NSE_COOKIE_TTL", "300"))
+
+QUOTE_TTL = float(os.environ.get("FINXTRACT_QUOTE_TTL", "15"))
+NSE_RATE = float(os.environ.get("FINXTRACT_NSE_RATE", "5"))     # requests / second
+NSE_BURST = int(os.environ.get("FINXTRACT_NSE_BURST", "10"))
+
+_HEADERS = {
+    "User-Agent": "Mozilla/5.0",
+    "Accept": "application/json",
+    "Referer": "https://www.nseindia.com/"
+}
+
+
+class NseQuoteClient:
+
+    def __init__(
+        self,
+        workers=NSE_WORKERS,
+        timeout=NSE_TIMEOUT,
+        cookie_ttl=NSE_COOKIE_TTL,
+        quote_ttl=QUOTE_TTL,
+        rate=NSE_RATE,
+        burst=NSE_BURST,
+    ):
+        self.workers = workers
+        self.timeout = timeout
+        self.cookie_ttl = cookie_ttl
+        self.quote_ttl = quote_ttl
+
+        self.session = requests.Session()
+        self.session.headers.update(_HEADERS)
+
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max(workers, 2))
+        self.session.mount("https://", adapter)
+
+        self._warm_lock = threading.Lock()
+        self._warmed_at = None
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="finxtract-nse")
+
+        # symbol -> (price, fetched_at)
+        self._quotes = {}
+        self._quotes_lock = threading.Lock()
+        self._flight = SingleFlight()
+
+        get_outbound().configure(
+            urlsplit(NSE_BASE_URL).netloc,
+            concurrency=workers, rate=rate, burst=burst, max_rate=rate,
+        )
+
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "upstream_calls": 0,
+        }
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def hit_rate(self):
+        with self._stats_lock:
+            # coalesced callers did not go upstream either
+            served = self.stats["hits"] + self.stats["coalesced"]
+            total = self.stats["hits"] + self.stats["misses"]
+        return served / total if total else 0.0
+
+    def summary(self):
+
+        # quote cache counters plus the NSE host's limiter state; throttled
+        # / throttle_wait_s are requests that waited on the local rate limit
+        with self._stats_lock:
+            stats = dict(self.stats)
+
+        host = get_outbound().stats(NSE_BASE_URL)
+        stats.update(
+            throttled=host["waited"],
+            throttle_wait_s=host["wait_s"],
+            rate_limited=host["throttled"],
+            retries=host["retries"],
+            rate=host["rate"],
+            circuit=host["circuit"],
+            p90_ms=host["p90_ms"],
+        )
+        return stats
+
+    def _get(self, url, **kwargs):
+        self._count("upstream_calls")
+        return get_outbound().request(self.session.get, url, timeout=self.timeout, **kwargs)
+
+    # ------------------------------
+    # Cookie warm-up
+    # ------------------------------
+    def _cookies_valid(self):
+
+        if self._warmed_at is None:
+            return False
+
+        if time.time() - self._warmed_at > self.cookie_ttl:
+            return False
+
+        now = time.time()
+        for cookie in self.session.cookies:
+            if cookie.expires is not None and cookie.expires <= now:
+                return False
+
+        return True
+
+    def _warm(self, force=False):
+
+        if not force and self._cookies_valid():
+            return
+
+        with self._warm_lock:
+            # another thread may have refreshed while we waited
+            if not force and self._cookies_valid():
+                return
+
+            self.session.cookies.clear()
+            self._get(NSE_BASE_URL)
+            self._warmed_at = time.time()
+
+    # ------------------------------
+    # Quotes
+    # ------------------------------
+    def _get_quote(self, symbol):
+        return self._get(f"{NSE_BASE_URL}/api/quote-equity", params={"symbol": symbol})
+
+    def _cached_quote(self, symbol):
+
+        with self._quotes_lock:
+            cached = self._quotes.get(symbol)
+
+        if cached and time.time() - cached[1] <= self.quote_ttl:
+            return cached[0]
+
+        return None
+
+    def fetch_quote(self, symbol):
+
+        price = self._cached_quote(symbol)
+        if price is not None:
+            self._count("hits")
+            return price
+
+        self._count("misses")
+
+        price, shared = self._flight.do(symbol, self._fetch_quote_upstream, symbol)
+        if shared:
+            self._count("coalesced")
+
+        return price
+
+    def _fetch_quote_upstream(self, symbol):
+
+        # a concurrent leader may have just filled it
+        price = self._cached_quote(symbol)
+        if price is not None:
+            return price
+
+        self._warm()
+
+        r = self._get_quote(symbol)
+
+        # stale / rejected cookies: refresh once and retry
+        if r.status_code in (401, 403):
+            warmed_at = self._warmed_at
+            with self._warm_lock:
+                if self._warmed_at == warmed_at:
+                    self._warmed_at = None
+            self._warm()
+            r = self._get_quote(symbol)
+
+            # refused with fresh cookies too: that is NSE pushing back
+            if r.status_code == 403:
+                get_outbound().host(NSE_BASE_URL).slow_down()
+
+        r.raise_for_status()
+
+        data = r.json()
+        price = float(data["priceInfo"]["lastPrice"])
+
+        with self._quotes_lock:
+            self._quotes[symbol] = (price, time.time())
+
+            # drop expired quotes now and then so the map stays small
+            if len(self._quotes) > 2000:
+                cutoff = time.time() - self.quote_ttl
+                self._quotes = {k: v for k, v in self._quotes.items() if v[1] > cutoff}
+
+        return price
+
+    def fetch_quotes(self, symbols):
+
+        symbols = list(dict.fromkeys(symbols))
+        prices, failures = {}, {}
+
+        if not symbols:
+            return prices, failures
+
+        # fresh quotes need no network (and no warm-up) at all
+        pending = []
+        for symbol in symbols:
+            price = self._cached_quote(symbol)
+            if price is None:
+                pending.append(symbol)
+            else:
+                self._count("hits")
+                prices[symbol] = price
+
+        if not pending:
+            return prices, failures
+
+        # warm once up front so the workers do not all race for it
+        try:
+            self._warm()
+        except Exception as e:
+            return prices, {s: f"{type(e).__name__}: {e}" for s in pending}
+
+        futures = {s: self._executor.submit(self.fetch_quote, s) for s in pending}
+
+        for symbol, future in futures.items():
+            try:
+                prices[symbol] = future.result()
+            except Exception as e:
+                failures[symbol] = f"{type(e).__name__}: {e}"
+
+        return prices, failures
+
+
+# ------------------------------
+# Process-wide client
+# ------------------------------
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_nse_client():
+
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = NseQuoteClient()
+
+    return _client
@@ -0,0 +1,412 @@
+import asyncio
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+from concurrency import TokenBucket
+
+# ------------------------------
+# Outbound request scheduler
+#
+# Every call to Screener / NSE (search API, HTTP engine, quote API,
+# page.goto) goes through one per-process scheduler that keeps, per host:
+#   - a cap on concurrent requests
+#   - a token bucket whose rate adapts (AIMD): it creeps up while the host
+#     answers, and halves on 429 / 503 / timeouts
+#   - jittered exponential retries for transient failures (429, 5xx,
+#     timeouts, dropped connections), honouring Retry-After
+#   - a circuit breaker: after N failures in a row the host is skipped for a
+#     cool-down, then one probe request decides whether it is back
+#   - a window of recent latencies for p50 / p90 / p99
+#
+# Process pools (batch.py, worker_service.py) set FINXTRACT_OUTBOUND_SHARE
+# to their worker count so the processes split one per-host budget.
+# ------------------------------
+
+OUTBOUND_SHARE = max(1, int(os.environ.get("FINXTRACT_OUTBOUND_SHARE", "1")))
+
+OUTBOUND_CONCURRENCY = int(os.environ.get("FINXTRACT_OUTBOUND_CONCURRENCY", "8"))
+OUTBOUND_RATE = float(os.environ.get("FINXTRACT_OUTBOUND_RATE", "10"))          # requests / second
+OUTBOUND_MAX_RATE = float(os.environ.get("FINXTRACT_OUTBOUND_MAX_RATE", "50"))
+OUTBOUND_BURST = int(os.environ.get("FINXTRACT_OUTBOUND_BURST", "30"))
+OUTBOUND_RETRIES = int(os.environ.get("FINXTRACT_OUTBOUND_RETRIES", "3"))
+OUTBOUND_BACKOFF = float(os.environ.get("FINXTRACT_OUTBOUND_BACKOFF", "0.5"))    # seconds, first retry
+OUTBOUND_MAX_BACKOFF = float(os.environ.get("FINXTRACT_OUTBOUND_MAX_BACKOFF", "30"))
+
+BREAKER_FAILURES = int(os.environ.get("FINXTRACT_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.environ.get("FINXTRACT_BREAKER_COOLDOWN", "30"))
+
+MIN_RATE = 0.2
+RATE_STEP = 0.5          # additive increase per successful request
+DECREASE_EVERY = 1.0     # a burst of 429s halves the rate once, not per response
+LATENCY_WINDOW = 512
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# not 403: NSE answers that for an expired session cookie, which the client
+# refreshes (it calls slow_down() itself if the refreshed retry is refused)
+THROTTLE_STATUSES = frozenset({429, 503})
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+def host_of(url):
+    return urlsplit(url).netloc.lower() or url.lower()
+
+
+def backoff_delay(attempt, retry_after=None):
+
+    # "full jitter": anywhere between 0 and the exponential cap
+    delay = random.uniform(0, min(OUTBOUND_MAX_BACKOFF, OUTBOUND_BACKOFF * 2 ** attempt))
+
+    if retry_after is not None:
+        delay = max(delay, min(OUTBOUND_MAX_BACKOFF, retry_after))
+
+    return delay
+
+
+def _retry_after(headers):
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class HostState:
+
+    def __init__(self, host, concurrency, rate, burst, max_rate):
+        self.host = host
+        self.concurrency = concurrency
+        self.max_rate = max_rate
+
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.bucket = TokenBucket(rate, burst)
+
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._open_until = None
+        self._probing = False
+        self._decreased_at = 0.0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+
+        self.stats = {
+            "requests": 0,
+            "waited": 0,
+            "ok": 0,
+            "retries": 0,
+            "throttled": 0,
+            "timeouts": 0,
+            "errors": 0,
+            "breaker_trips": 0,
+            "short_circuited": 0,
+            "wait_s": 0.0,
+        }
+
+    # ------------------------------
+    # Circuit breaker
+    # ------------------------------
+    def check(self):
+
+        with self._lock:
+            if self._open_until is None:
+                return
+
+            remaining = self._open_until - time.monotonic()
+            if remaining > 0 or self._probing:
+                self.stats["short_circuited"] += 1
+                raise CircuitOpen(
+                    f"{self.host}: circuit open, retrying in {max(remaining, 0):.0f}s"
+                )
+
+            # half-open: let this one request through as the probe
+            self._probing = True
+
+    def _trip(self):
+        self._open_until = time.monotonic() + BREAKER_COOLDOWN
+        self.stats["breaker_trips"] += 1
+        print(f"--- Circuit open for {self.host} ({self._failures} failures in a row)")
+
+    # ------------------------------
+    # Outcomes
+    # ------------------------------
+    def record_wait(self, waited):
+        with self._lock:
+            self.stats["requests"] += 1
+            if waited:
+                self.stats["waited"] += 1
+                self.stats["wait_s"] += waited
+
+    def record_retry(self):
+        with self._lock:
+            self.stats["retries"] += 1
+
+    def abandon(self):
+        # a non-transient error says nothing about the host; free the probe
+        with self._lock:
+            self._probing = False
+
+    def record_response(self, status, latency):
+
+        with self._lock:
+            self._latencies.append(latency)
+
+        if status in THROTTLE_STATUSES:
+            self.slow_down()
+
+        if status in RETRY_STATUSES:
+            self._failed()
+        else:
+            self._succeeded(throttled=status in THROTTLE_STATUSES)
+
+    def record_error(self, timeout):
+
+        with self._lock:
+            self.stats["timeouts" if timeout else "errors"] += 1
+
+        if timeout:
+            self.slow_down()
+        self._failed()
+
+    def _succeeded(self, throttled=False):
+
+        with self._lock:
+            self._failures = 0
+            self._open_until = None
+            self._probing = False
+            if not throttled:
+                self.stats["ok"] += 1
+
+        if not throttled:
+            self.bucket.set_rate(min(self.max_rate, self.bucket.rate + RATE_STEP))
+
+    def _failed(self):
+
+        with self._lock:
+            self._failures += 1
+
+            if self._probing:
+                # the probe failed: stay open for another cool-down
+                self._probing = False
+                self._trip()
+            elif self._open_until is None and self._failures >= BREAKER_FAILURES:
+                self._trip()
+
+    def slow_down(self):
+
+        with self._lock:
+            self.stats["throttled"] += 1
+
+            now = time.monotonic()
+            if now - self._decreased_at < DECREASE_EVERY:
+                return
+            self._decreased_at = now
+
+        self.bucket.set_rate(max(MIN_RATE, self.bucket.rate / 2))
+
+    # ------------------------------
+    # Reporting
+    # ------------------------------
+    def percentiles(self):
+
+        with self._lock:
+            window = sorted(self._latencies)
+
+        if not window:
+            return {"p50_ms": None, "p90_ms": None, "p99_ms": None}
+
+        def pick(q):
+            return round(window[min(len(window) - 1, math.ceil(q * len(window)) - 1)] * 1000, 1)
+
+        return {"p50_ms": pick(0.5), "p90_ms": pick(0.9), "p99_ms": pick(0.99)}
+
+    def summary(self):
+
+        with self._lock:
+            stats = dict(self.stats)
+            state = "closed" if self._open_until is None else ("half-open" if self._probing else "open")
+
+        stats["wait_s"] = round(stats["wait_s"], 3)
+        return {
+            **stats,
+            "rate": round(self.bucket.rate, 2),
+            "concurrency": self.concurrency,
+            "circuit": state,
+            **self.percentiles(),
+        }
+
+
+class OutboundScheduler:
+
+    def __init__(self):
+        self._hosts = {}
+        self._policies = {}
+        self._lock = threading.Lock()
+
+    def configure(self, host, concurrency=None, rate=None, burst=None, max_rate=None):
+
+        # per-host overrides; takes effect for hosts not contacted yet
+        policy = {
+            k: v for k, v in
+            (("concurrency", concurrency), ("rate", rate), ("burst", burst), ("max_rate", max_rate))
+            if v is not None
+        }
+        with self._lock:
+            self._policies[host.lower()] = policy
+
+    def host(self, url):
+
+        host = host_of(url)
+
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                policy = self._policies.get(host, {})
+                rate = policy.get("rate", OUTBOUND_RATE) / OUTBOUND_SHARE
+                state = self._hosts[host] = HostState(
+                    host,
+                    concurrency=max(1, math.ceil(policy.get("concurrency", OUTBOUND_CONCURRENCY) / OUTBOUND_SHARE)),
+                    rate=rate,
+                    burst=max(1, policy.get("burst", OUTBOUND_BURST) // OUTBOUND_SHARE),
+                    max_rate=max(rate, policy.get("max_rate", OUTBOUND_MAX_RATE) / OUTBOUND_SHARE),
+                )
+
+        return state
+
+    # ------------------------------
+    # Blocking callers (requests)
+    # ------------------------------
+    def _enter(self, state):
+        state.check()
+        state.slots.acquire()
+        try:
+            state.record_wait(state.bucket.acquire())
+        except BaseException:
+            state.slots.release()
+            raise
+
+    def request(self, send, url, *args, retries=None, **kwargs):
+
+        # send(url, *args, **kwargs) -> requests.Response, e.g. session.get
+        import requests
+
+        state = self.host(url)
+        retries = OUTBOUND_RETRIES if retries is None else retries
+
+        for attempt in range(retries + 1):
+
+            self._enter(state)
+            t0 = time.perf_counter()
+            retry_after = None
+
+            try:
+                r = send(url, *args, **kwargs)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                state.record_error(timeout=isinstance(e, requests.Timeout))
+                if attempt == retries:
+                    raise
+            except Exception:
+                state.abandon()
+                raise
+            else:
+                state.record_response(r.status_code, time.perf_counter() - t0)
+                if r.status_code not in RETRY_STATUSES or attempt == retries:
+                    return r
+                retry_after = _retry_after(r.headers)
+                r.close()
+            finally:
+                state.slots.release()
+
+            state.record_retry()
+            time.sleep(backoff_delay(attempt, retry_after))
+
+    # ------------------------------
+    # Async callers (Playwright, on the browser pool loop)
+    # ------------------------------
+    async def _enter_async(self, state):
+
+        # slot / token waits block, so they must not run on the loop
+        entering = asyncio.ensure_future(asyncio.to_thread(self._enter, state))
+
+        def entered_too_late(entering):
+            if not entering.cancelled() and entering.exception() is None:
+                state.abandon()
+                state.slots.release()
+
+        try:
+            await asyncio.shield(entering)
+        except asyncio.CancelledError:
+            # the thread cannot be interrupted and will still take the slot;
+            # give it back as soon as it does
+            entering.add_done_callback(entered_too_late)
+            raise
+
+    async def run_async(self, url, fn, *args, retries=None, **kwargs):
+
+        # fn(*args, **kwargs) -> awaitable of a Playwright Response (or None)
+        from playwright.async_api import Error as PlaywrightError
+        from playwright.async_api import TimeoutError as PlaywrightTimeout
+
+        state = self.host(url)
+        retries = OUTBOUND_RETRIES if retries is None else retries
+
+        for attempt in range(retries + 1):
+
+            await self._enter_async(state)
+            t0 = time.perf_counter()
+            retry_after = None
+
+            try:
+                response = await fn(*args, **kwargs)
+            except PlaywrightError as e:
+                state.record_error(timeout=isinstance(e, PlaywrightTimeout))
+                if attempt == retries:
+                    raise
+            except (Exception, asyncio.CancelledError):
+                state.abandon()
+                raise
+            else:
+                status = response.status if response is not None else 200
+                state.record_response(status, time.perf_counter() - t0)
+                if status not in RETRY_STATUSES or attempt == retries:
+                    return response
+                retry_after = _retry_after(await response.all_headers())
+            finally:
+                state.slots.release()
+
+            state.record_retry()
+            await asyncio.sleep(backoff_delay(attempt, retry_after))
+
+    # ------------------------------
+    # Reporting
+    # ------------------------------
+    def stats(self, url):
+        return self.host(url).summary()
+
+    def summary(self):
+        with self._lock:
+            hosts = dict(self._hosts)
+        return {host: state.summary() for host, state in hosts.items()}
+
+
+# ------------------------------
+# Process-wide scheduler
+# ------------------------------
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_outbound():
+
+    global _scheduler
+
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = OutboundScheduler()
+
+    return _scheduler
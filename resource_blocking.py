@@ -0,0 +1,140 @@
+import os
+import re
+import threading
+
+# ------------------------------
+# Request interception for scrape contexts
+#
+# We only read table / h2 / h3 content, so anything that is not the page
+# itself, its scripts or its data calls is aborted before it hits the wire.
+# ------------------------------
+
+BLOCK_RESOURCES = os.environ.get("FINXTRACT_BLOCK_RESOURCES", "1") == "1"
+
+# resource types that are allowed through (playwright request.resource_type)
+ALLOWED_RESOURCE_TYPES = frozenset({"document", "script", "xhr", "fetch"})
+
+# third-party scripts that are "script" typed but never needed for tables
+BLOCKED_URL_PATTERNS = (
+    r"googletagmanager\.com",
+    r"google-analytics\.com",
+    r"googlesyndication\.com",
+    r"doubleclick\.net",
+    r"adservice\.google",
+    r"facebook\.(net|com)",
+    r"hotjar\.com",
+    r"clarity\.ms",
+    r"sentry(-cdn)?\.io",
+    r"cloudflareinsights\.com",
+)
+
+# typical transfer size (bytes) per blocked resource type, for estimating
+# what blocking saved; replaced by the observed average once scrapes have
+# run with blocking disabled (FINXTRACT_BLOCK_RESOURCES=0)
+DEFAULT_RESOURCE_SIZES = {
+    "image": 30_000,
+    "media": 250_000,
+    "font": 40_000,
+    "stylesheet": 25_000,
+    "script": 50_000,       # third-party tags
+    "other": 5_000,
+}
+
+_learned_sizes = {}
+_learned_lock = threading.Lock()
+
+
+def _learn_size(resource_type, size):
+
+    with _learned_lock:
+        total, count = _learned_sizes.get(resource_type, (0, 0))
+        _learned_sizes[resource_type] = (total + size, count + 1)
+
+
+def _average_size(resource_type):
+
+    with _learned_lock:
+        total, count = _learned_sizes.get(resource_type, (0, 0))
+
+    if count:
+        return total / count
+
+    return DEFAULT_RESOURCE_SIZES.get(resource_type, DEFAULT_RESOURCE_SIZES["other"])
+
+
+class ResourceBlocker:
+
+    def __init__(
+        self,
+        allowed_types=ALLOWED_RESOURCE_TYPES,
+        blocked_patterns=BLOCKED_URL_PATTERNS,
+        enabled=BLOCK_RESOURCES,
+    ):
+        self.allowed_types = frozenset(allowed_types)
+        self.blocked = re.compile("|".join(blocked_patterns)) if blocked_patterns else None
+        self.enabled = enabled
+
+        self.requests_allowed = 0
+        self.bytes_downloaded = 0
+        self.blocked_by_type = {}
+
+    def should_block(self, resource_type, url):
+
+        if resource_type not in self.allowed_types:
+            return True
+
+        return bool(self.blocked and self.blocked.search(url))
+
+    async def install(self, context):
+
+        if self.enabled:
+            await context.route("**/*", self._handle_route)
+
+        context.on("requestfinished", self._on_request_finished)
+
+    async def _handle_route(self, route):
+
+        request = route.request
+
+        if self.should_block(request.resource_type, request.url):
+            rtype = request.resource_type
+            self.blocked_by_type[rtype] = self.blocked_by_type.get(rtype, 0) + 1
+            await route.abort("blockedbyclient")
+            return
+
+        await route.continue_()
+
+    async def _on_request_finished(self, request):
+
+        self.requests_allowed += 1
+
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            return
+
+        size = sizes.get("responseBodySize", 0) + sizes.get("responseHeadersSize", 0)
+        if size <= 0:
+            return
+
+        self.bytes_downloaded += size
+
+        if not self.enabled:
+            _learn_size(request.resource_type, size)
+
+    @property
+    def requests_blocked(self):
+        return sum(self.blocked_by_type.values())
+
+    def bytes_saved_estimate(self):
+
+        return int(sum(_average_size(rtype) * count for rtype, count in self.blocked_by_type.items()))
+
+    def summary(self):
+        return {
+            "requests_allowed": self.requests_allowed,
+            "requests_blocked": self.requests_blocked,
+            "blocked_by_type": dict(self.blocked_by_type),
+            "bytes_downloaded": self.bytes_downloaded,
+            "bytes_saved_estimate": self.bytes_saved_estimate(),
+        }
@@ -0,0 +1,124 @@
+import threading
+
+import metrics
+from concurrency import SingleFlight
+from snapshot_cache import normalize_company_url
+
+# ------------------------------
+# One in-flight fetch per (company URL, statement mode)
+#
+# When several sessions ask for the same company at the same time, the
+# first one does the render; the others attach to it, receive the same
+# snapshots, and see the leader's progress stages on their own callbacks.
+# ------------------------------
+
+
+class ScrapeCoordinator:
+
+    def __init__(self):
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+
+        # key -> [on_stage callbacks], key -> last stage seen
+        self._listeners = {}
+        self._stages = {}
+
+
+    def _broadcast(self, key):
+
+        def on_stage(stage):
+            with self._lock:
+                self._stages[key] = stage
+                listeners = list(self._listeners.get(key, ()))
+            for callback in listeners:
+                callback(stage)
+
+        return on_stage
+
+    def _listen(self, company_url, mode, on_stage):
+
+        key = (normalize_company_url(company_url), mode)
+
+        with self._lock:
+            if on_stage is not None:
+                self._listeners.setdefault(key, []).append(on_stage)
+            stage = self._stages.get(key)
+
+        # late joiners start from where the leader is
+        if stage is not None and on_stage is not None:
+            on_stage(stage)
+
+        return key
+
+    def _unlisten(self, key, on_stage):
+        with self._lock:
+            listeners = self._listeners.get(key, [])
+            if on_stage in listeners:
+                listeners.remove(on_stage)
+            if not listeners:
+                self._listeners.pop(key, None)
+                self._stages.pop(key, None)
+
+    def _joined(self, company_url, mode):
+        metrics.count("coalesced")
+        print("--- Joined in-flight scrape:", company_url, mode)
+
+    def run(self, company_url, mode, fn, *args, on_stage=None):
+
+        # fn(*args, on_stage) does the actual fetch
+        key = self._listen(company_url, mode, on_stage)
+
+        try:
+            result, shared = self._flight.do(key, fn, *args, self._broadcast(key))
+        finally:
+            self._unlisten(key, on_stage)
+
+        if shared:
+            self._joined(company_url, mode)
+
+        return result
+
+    async def run_async(self, company_url, mode, fn, *args, on_stage=None):
+
+        # run() for callers on an event loop; fn is a coroutine function, so
+        # cancelling the caller (e.g. a watchlist timeout) cancels the fetch
+        # it leads, and the sync / async callers of one key still share it
+        key = self._listen(company_url, mode, on_stage)
+
+        try:
+            result, shared = await self._flight.do_async(key, fn, *args, self._broadcast(key))
+        finally:
+            self._unlisten(key, on_stage)
+
+        if shared:
+            self._joined(company_url, mode)
+
+        return result
+
+    @property
+    def stats(self):
+        # counted when a caller joins, so failed scrapes are included too
+        return {
+            "leaders": self._flight.stats["leaders"],
+            "coalesced": self._flight.stats["shared"],
+            "in_flight": self._flight.in_flight(),
+        }
+
+    def in_flight(self):
+        return self._flight.in_flight()
+
+
+_coordinator = None
+_coordinator_lock = threading.Lock()
+
+
+def get_scrape_coordinator():
+
+    global _coordinator
+
+    if _coordinator is None:
+        with _coordinator_lock:
+            if _coordinator is None:
+                _coordinator = ScrapeCoordinator()
+
+    return _coordinator
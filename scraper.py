@@ -0,0 +1,625 @@
+import sys
+import asyncio
+import os
+import time
+
+import metrics
+from browser_pool import get_browser_pool
+from company_index import get_company_index, pick_search_result
+from expansion import (
+    expand_all_tables,
+    install_page_helpers,
+    wait_for_page_quiet,
+    wait_for_peer_cmp,
+)
+from outbound import get_outbound
+from resource_blocking import ResourceBlocker
+from scrape_coordinator import get_scrape_coordinator
+from section_fingerprints import diff_fingerprints, fingerprint_section, get_section_cache
+from section_index import get_parser_backend, index_sections
+from snapshot_cache import get_snapshot_cache
+from symbol_index import get_symbol_index
+
+# pandas / requests / lxml backed modules are imported where they are used,
+# so importing the scraper (UI cold start, other tools) stays cheap
+
+if sys.platform.startswith("win"):
+    asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+
+# "auto": plain HTTP first, browser only for layouts it cannot handle
+# "http" / "browser": force one engine
+SCRAPE_ENGINE = os.environ.get("FINXTRACT_ENGINE", "auto")
+
+# capture the Quarterly and Yearly views from two pages at the same time
+PARALLEL_CAPTURE = os.environ.get("FINXTRACT_PARALLEL_CAPTURE", "1") == "1"
+
+
+# progress stages reported to on_stage callbacks, in order
+SCRAPE_STAGES = ("search", "render", "expand", "parse", "peer patch")
+
+
+def _stage(on_stage, name):
+    if on_stage is not None:
+        on_stage(name)
+
+
+# ------------------------------
+# Screener search by company name
+# ------------------------------
+def search_screener_companies(company_name):
+
+    index = get_company_index()
+
+    data = index.memo_get(company_name)
+    if data is not None:
+        metrics.count("memo_hit")
+        return data
+
+    metrics.count("api_calls")
+
+    import requests
+
+    url = "https://www.screener.in/api/company/search/"
+
+    r = get_outbound().request(
+        requests.get,
+        url,
+        params={"q": company_name},
+        headers={"User-Agent": "Mozilla/5.0"},
+        timeout=15
+    )
+    r.raise_for_status()
+
+    data = r.json()
+
+    index.memo_put(company_name, data)
+    index.add_search_results(company_name, data)
+
+    return data
+
+
+def find_screener_company_by_name(company_name):
+
+    with metrics.span("search"):
+
+        # known companies resolve from the local index, no HTTP at all
+        path = get_company_index().resolve(company_name)
+        if path:
+            metrics.count("index_hit")
+            return "https://www.screener.in" + path
+
+        best = pick_search_result(company_name, search_screener_companies(company_name))
+
+    if not best:
+        return None
+
+    return "https://www.screener.in" + best["url"]
+
+async def _open_company_page(context, url):
+
+    page = await context.new_page()
+
+    with metrics.span("goto"):
+        await get_outbound().run_async(url, page.goto, url, timeout=60000)
+
+    with metrics.span("wait peers") as s:
+        await page.wait_for_selector(
+            "//h2[normalize-space()='Peer comparison']/following::table[1]",
+            timeout=60000
+        )
+
+        # wait for JS to fill the CMP / P-E cells instead of a fixed sleep
+        if not await wait_for_peer_cmp(page):
+            s.count("cmp_timeouts")
+
+    return page
+
+
+async def _snapshot_view(page, view, on_stage=None):
+
+    btn = page.locator(f"//button[normalize-space()='{view}']")
+    if await btn.count():
+        with metrics.span("switch view", view=view):
+            await btn.first.click(force=True)
+            await wait_for_page_quiet(page)
+
+    _stage(on_stage, "expand")
+    with metrics.span("expand", view=view) as s:
+        report = await expand_all_tables(page)
+        s.count("clicks", report["clicks"])
+        s.count("rows_expanded", report["rows_expanded"])
+        s.count("rounds", report["rounds"])
+
+    with metrics.span("snapshot", view=view) as s:
+        html = await page.content()
+        s.count("bytes", len(html))
+    return html
+
+
+async def _capture_expanded_snapshots(context, url, on_stage=None):
+
+    await install_page_helpers(context)
+
+    blocker = ResourceBlocker()
+    await blocker.install(context)
+
+    try:
+        return await _capture_views(context, url, on_stage)
+    finally:
+        stats = blocker.summary()
+        for event in ("requests_allowed", "requests_blocked", "bytes_downloaded", "bytes_saved_estimate"):
+            metrics.count(event, stats[event])
+
+
+async def _capture_views(context, url, on_stage=None):
+
+    if PARALLEL_CAPTURE:
+        # both views wait on the same network / JS timing, so overlap them
+        # in two pages of the same context (shared HTTP cache and cookies)
+        async def capture(view):
+            page = await _open_company_page(context, url)
+            return await _snapshot_view(page, view, on_stage)
+
+        html_periodic, html_yearly = await asyncio.gather(
+            capture("Quarterly"),
+            capture("Yearly"),
+        )
+        return html_periodic, html_yearly
+
+    page = await _open_company_page(context, url)
+
+    # -------------------- Periodic / Quarterly --------------------
+    html_periodic = await _snapshot_view(page, "Quarterly", on_stage)
+
+    # -------------------- Yearly --------------------
+    html_yearly = await _snapshot_view(page, "Yearly", on_stage)
+
+    return html_periodic, html_yearly
+
+
+async def render_snapshots_in_pool(pool, url, on_stage=None):
+
+    t0 = time.perf_counter()
+
+    # isolated context per scrape: no cookies / storage leak between users
+    with metrics.span("render") as s:
+        async with pool.context() as context:
+            s.set("context_ms", round((time.perf_counter() - t0) * 1000, 1))
+            return await _capture_expanded_snapshots(context, url, on_stage)
+
+
+def get_screener_html_with_expanded_rows(url, on_stage=None):
+
+    pool = get_browser_pool()
+    return pool.run(render_snapshots_in_pool, pool, url, on_stage)
+
+
+# ------------------------------
+# Browser-free engine (falls back to the browser on unknown layouts and
+# failed requests)
+# ------------------------------
+def fetch_snapshots_over_http(company_url, on_stage=None):
+
+    if SCRAPE_ENGINE == "browser":
+        return None
+
+    import requests
+    from http_engine import LayoutNotSupported, get_http_engine
+    from outbound import CircuitOpen
+
+    # a fallback is counted on the caller's span; the reason is the error
+    # recorded on the "http engine" span
+    try:
+        with metrics.span("http engine"):
+            return get_http_engine().fetch_snapshots(company_url, on_stage)
+    except LayoutNotSupported:
+        if SCRAPE_ENGINE == "http":
+            raise
+        metrics.count("http_engine_fallback")
+        return None
+    except (requests.RequestException, CircuitOpen):
+        # blocked / failing API calls (after the outbound retries), or the
+        # host's breaker is open
+        if SCRAPE_ENGINE == "http":
+            raise
+        metrics.count("http_engine_fallback")
+        return None
+
+
+# ------------------------------
+# Snapshots with on-disk cache in front of the engines
+# ------------------------------
+def fetch_screener_snapshots(company_url, mode, on_stage=None):
+
+    _stage(on_stage, "render")
+
+    with metrics.span("fetch", mode=mode):
+
+        cache = get_snapshot_cache()
+
+        cached = cache.get(company_url, mode)
+        if cached is not None:
+            metrics.count("snapshot_cache_hit")
+            return cached
+
+        metrics.count("snapshot_cache_miss")
+
+        # identical concurrent requests (other sessions) share one fetch
+        return get_scrape_coordinator().run(
+            company_url, mode, _fetch_and_cache_snapshots, company_url, mode, on_stage=on_stage
+        )
+
+
+async def fetch_screener_snapshots_async(company_url, mode, on_stage=None, pool=None):
+
+    # fetch_screener_snapshots for callers on an event loop (watchlist):
+    # the render is awaited, so cancelling the caller stops it
+    _stage(on_stage, "render")
+
+    with metrics.span("fetch", mode=mode):
+
+        cached = await asyncio.to_thread(get_snapshot_cache().get, company_url, mode)
+        if cached is not None:
+            metrics.count("snapshot_cache_hit")
+            return cached
+
+        metrics.count("snapshot_cache_miss")
+
+        return await get_scrape_coordinator().run_async(
+            company_url, mode, _fetch_and_cache_snapshots_async, company_url, mode, pool,
+            on_stage=on_stage,
+        )
+
+
+def _fetch_and_cache_snapshots(company_url, mode, on_stage=None):
+    pool = get_browser_pool()
+    return pool.run(_fetch_and_cache_snapshots_async, company_url, mode, pool, on_stage)
+
+
+async def _fetch_and_cache_snapshots_async(company_url, mode, pool=None, on_stage=None):
+
+    cache = get_snapshot_cache()
+
+    # a fetch that just finished may already have filled it
+    cached = await asyncio.to_thread(cache.get, company_url, mode)
+    if cached is not None:
+        return cached
+
+    snapshots = await asyncio.to_thread(fetch_snapshots_over_http, company_url, on_stage)
+    if snapshots is None:
+        pool = pool or get_browser_pool()
+        snapshots = await pool.run_async(render_snapshots_in_pool, pool, company_url, on_stage)
+
+    html_periodic, html_yearly = snapshots
+    await asyncio.to_thread(cache.put, company_url, mode, html_periodic, html_yearly)
+
+    return html_periodic, html_yearly
+
+#------------------------------
+# Fetch live CMP from NSE (for validation)
+#------------------------------
+def fetch_live_cmp_nse(symbol):
+
+    from nse_client import get_nse_client
+
+    return get_nse_client().fetch_quote(symbol)
+
+#------------------------------
+#patch peer comparison table with live CMPs from NSE (best effort, for validation only)
+#------------------------------
+def patch_peer_comparison_with_live_prices(df):
+
+    if "Name" not in df.columns or "CMP Rs." not in df.columns:
+        return df
+
+    # Screener name -> NSE symbol, from the NSE master list + overrides
+    symbols = get_symbol_index()
+
+    rows = {}
+    unresolved = []
+    for i in df.index:
+
+        name = str(df.at[i, "Name"]).strip()
+
+        symbol = symbols.resolve(name)
+        if symbol:
+            rows[i] = symbol
+        elif name and name.lower() != "nan" and not name.lower().startswith("median"):
+            unresolved.append(name)
+
+    symbols.save()
+    metrics.count("symbols_unresolved", len(unresolved))
+
+    if unresolved:
+        print("--- No confident NSE symbol for:", unresolved)
+
+    if not rows:
+        return df
+
+    # one warmed session, all peers in parallel (recent quotes come from cache)
+    from nse_client import get_nse_client
+
+    client = get_nse_client()
+    prices, failures = client.fetch_quotes(rows.values())
+    metrics.count("peers_patched", len(prices))
+    metrics.count("quotes_failed", len(failures))
+
+    # live prices are floats; an all-integer CMP column would reject them
+    if df["CMP Rs."].dtype.kind in "iu":
+        df["CMP Rs."] = df["CMP Rs."].astype(float)
+
+    for i, symbol in rows.items():
+        if symbol in prices:
+            # only CMP is overwritten: P/E cannot be recomputed without EPS
+            df.at[i, "CMP Rs."] = prices[symbol]
+
+    df.attrs["peer_patch"] = {
+        "patched": sorted(prices),
+        "failed": failures,
+        "unresolved": unresolved,
+    }
+
+    if failures:
+        print("--- NSE quotes failed:", failures)
+
+    return df
+
+# ------------------------------
+# Scrape Screener tables by company name
+# ------------------------------
+def resolve_company_url(company_name, mode):
+
+    company_url = find_screener_company_by_name(company_name)
+
+    if not company_url:
+        return None
+
+    # ---------------------------------
+    # ALWAYS normalize base company URL
+    # ---------------------------------
+    company_url = company_url.replace("/consolidated/", "").rstrip("/") + "/"
+
+    # ---------------------------------
+    # Consolidated / Standalone switch
+    # ---------------------------------
+    if mode == "Consolidated":
+        company_url = company_url + "consolidated/"
+
+    return company_url
+
+
+def scrape_screener_financials_by_name(company_name, mode):
+
+    company_url = resolve_company_url(company_name, mode)
+
+    if not company_url:
+        return None, {}
+
+    # ✅ only ONE html now
+    html_periodic, html_yearly = fetch_screener_snapshots(company_url, mode)
+
+    return company_url, parse_screener_snapshots(
+        html_periodic, html_yearly, change_key=(company_url, mode)
+    )
+
+
+# ------------------------------
+# Parse rendered snapshots into section tables
+# ------------------------------
+def _section_key(section, df):
+
+    # -----------------------------
+    # Section name
+    # -----------------------------
+    if section.heading is not None:
+        key = section.heading
+    else:
+        key = "Table"
+
+    # ------------------------------------------------
+    # SMART rename for mini KPI tables
+    # ------------------------------------------------
+    try:
+        if df.shape[1] == 2 and df.shape[0] <= 6:
+
+            first_col = str(df.columns[0]).strip().lower()
+
+            if "unnamed" in first_col:
+                label = str(df.iloc[0, 0]).strip()
+            else:
+                label = str(df.columns[0]).strip()
+
+            kpi_labels = {
+                "compounded sales growth",
+                "compounded profit growth",
+                "stock price cagr",
+                "return on equity"
+            }
+
+            if label.lower() in kpi_labels:
+                key = label
+    except:
+        pass
+
+    # ---------------------------------------
+    # Shareholding pattern naming
+    # ---------------------------------------
+    if key.lower().startswith("shareholding"):
+
+        try:
+            cols = list(df.columns)[1:]
+
+            months = []
+            for c in cols:
+                c = str(c).strip()
+                parts = c.split()
+                if parts:
+                    months.append(parts[0].lower())
+
+            non_mar = [m for m in months if m != "mar"]
+
+            if len(non_mar) >= 3:
+                key = "Shareholding Pattern (Periodic)"
+            else:
+                key = "Shareholding Pattern (Yearly)"
+
+        except:
+            pass
+
+    return key
+
+
+def parse_screener_snapshots(html_periodic, html_yearly, backend=None, change_key=None):
+
+    # change_key: (company_url, mode) to reuse sections unchanged since the
+    # last parse of that company; None parses everything
+    return dict(iter_parsed_sections(html_periodic, html_yearly, backend, change_key))
+
+
+def iter_parsed_sections(html_periodic, html_yearly, backend=None, change_key=None, on_stage=None):
+
+    # yields (section name, frame) in page order, each as soon as it is done
+    _stage(on_stage, "parse")
+
+    from normalize import normalize_financial_table
+    from table_builder import build_table
+
+    backend = backend or get_parser_backend()
+
+    # timed by hand: a span cannot stay open across the yields below
+    t0 = time.perf_counter()
+    parse_s = 0.0
+    parse_counts = {"tables_found": 0, "tables_built": 0, "tables_reused": 0, "build_failed": 0}
+
+    sections_main = index_sections(html_periodic, backend)
+
+    # the HTTP engine hands back one document for both views
+    if html_yearly == html_periodic:
+        sections_yearly = sections_main
+    else:
+        sections_yearly = index_sections(html_yearly, backend)
+
+    # ---------- everything except shareholding from periodic snapshot,
+    # ---------- then shareholding from the periodic and yearly snapshots
+    sections = [s for s in sections_main if not s.is_shareholding]
+    sections += [s for s in sections_main if s.is_shareholding]
+    sections += [s for s in sections_yearly if s.is_shareholding]
+    parse_counts["tables_found"] = len(sections)
+
+    section_cache = get_section_cache() if change_key else None
+    previous = section_cache.load(*change_key) if section_cache else None
+
+    fingerprints = {}
+    entries = {}
+
+    result = {}
+
+    parse_s += time.perf_counter() - t0
+
+    for section in sections:
+
+        t0 = time.perf_counter()
+        fp = cached = None
+        if previous is not None:
+            fp = fingerprint_section(section, backend)
+            cached = previous["entries"].get(fp) or entries.get(fp)
+            if cached is not None and cached[1] is None and cached[0] not in result:
+                cached = None     # dropped as a duplicate last time, needed now
+            section_cache.count(cached is not None)
+
+        if cached is not None:
+            # same HTML as last time: name and finished frame are known
+            key, df = cached
+            parse_counts["tables_reused"] += 1
+        else:
+            try:
+                df = build_table(section.table, backend)
+            except Exception:
+                parse_counts["build_failed"] += 1
+                parse_s += time.perf_counter() - t0
+                continue
+            parse_counts["tables_built"] += 1
+
+            key = _section_key(section, df)
+
+        # ------------------------------------------------
+        # 🚨 very important: do NOT allow duplicate
+        # Shareholding tables
+        # ------------------------------------------------
+        if key.startswith("Shareholding"):
+            if key in result:
+                # remember the name so the duplicate is not rebuilt next time
+                if fp is not None:
+                    entries.setdefault(fp, (key, None))
+                parse_s += time.perf_counter() - t0
+                continue
+
+        # -----------------------------
+        # Make key unique (others only)
+        # -----------------------------
+        base_key = key
+        cnt = 1
+        while key in result:
+            cnt += 1
+            key = f"{base_key} ({cnt})"
+
+        if cached is None:
+            if key.strip().lower() == "peer comparison":
+                _stage(on_stage, "peer patch")
+                # the peer patch is its own span; keep it out of parse time
+                parse_s += time.perf_counter() - t0
+                with metrics.span("peer patch"):
+                    df = patch_peer_comparison_with_live_prices(df)
+                t0 = time.perf_counter()
+                _stage(on_stage, "parse")
+
+            df = normalize_financial_table(df)
+
+        if fp is not None:
+            entries[fp] = (base_key, df)
+            fingerprints[key] = fp
+
+        result[key] = df
+        parse_s += time.perf_counter() - t0
+        yield key, df
+
+    if section_cache is not None:
+        report = diff_fingerprints(previous["fingerprints"], fingerprints)
+        section_cache.save(*change_key, fingerprints, entries, report)
+
+        for state in ("changed", "new", "removed", "unchanged"):
+            parse_counts[f"sections_{state}"] = len(report[state])
+        if report["changed"]:
+            print("--- Changed sections:", report["changed"])
+
+    metrics.record("parse", parse_s, parse_counts, backend=backend.name)
+
+# ------------------------------
+# Layout / health validation
+# ------------------------------
+def validate_core_sections(tables: dict):
+
+    keys = [k.lower() for k in tables.keys()]
+
+    checks = {
+        "Profit & Loss": any("profit" in k and "loss" in k for k in keys),
+        "Balance Sheet": any("balance" in k for k in keys),
+        "Quarterly Results": any("quarter" in k for k in keys),
+    }
+
+    missing = [name for name, ok in checks.items() if not ok]
+    return missing
+
+
+# ------------------------------
+# Excel download helper
+# ------------------------------
+def to_excel_bytes(dfs: dict):
+
+    from excel_export import get_export_cache
+
+    # streamed workbook, built once per fetched result
+    with metrics.span("excel export") as s:
+        data = get_export_cache().get(dfs)
+        s.count("bytes", len(data))
+        return data
@@ -0,0 +1,126 @@
+import hashlib
+import os
+import pickle
+import threading
+
+from snapshot_cache import CACHE_DIR, normalize_company_url
+
+# ------------------------------
+# Per-section change detection
+#
+# Each section table is fingerprinted (heading + table HTML). Per company
+# and statement mode we keep the fingerprints of the last run and the
+# finished DataFrame for each, so sections whose HTML did not change skip
+# build/normalize/peer patch entirely and only changed ones are parsed.
+# Bump PIPELINE_VERSION when parsing output changes to drop old entries.
+# ------------------------------
+
+PIPELINE_VERSION = "1"
+
+SECTION_CACHE = os.environ.get("FINXTRACT_SECTION_CACHE", "1") == "1"
+
+
+def fingerprint_section(section, backend):
+
+    h = hashlib.sha1()
+    h.update(f"{PIPELINE_VERSION}|{backend.name}|{section.heading}|".encode())
+    h.update(backend.table_html(section.table).encode())
+    return h.hexdigest()
+
+
+def diff_fingerprints(previous, current):
+
+    # previous / current: {section name: fingerprint}
+    report = {"changed": [], "new": [], "removed": [], "unchanged": []}
+
+    for key, fp in current.items():
+        if key not in previous:
+            report["new"].append(key)
+        elif previous[key] != fp:
+            report["changed"].append(key)
+        else:
+            report["unchanged"].append(key)
+
+    report["removed"] = [key for key in previous if key not in current]
+
+    return report
+
+
+class SectionCache:
+
+    def __init__(self, directory, enabled=SECTION_CACHE):
+        self.directory = directory
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._reports = {}
+
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _path(self, company_url, mode):
+        digest = hashlib.sha1(
+            f"{normalize_company_url(company_url)}|{mode}".encode()
+        ).hexdigest()
+        return os.path.join(self.directory, digest + ".pkl")
+
+    def load(self, company_url, mode):
+
+        # {"fingerprints": {name: fp}, "entries": {fp: (name, df)}}
+        empty = {"fingerprints": {}, "entries": {}}
+
+        if not self.enabled:
+            return empty
+
+        try:
+            with open(self._path(company_url, mode), "rb") as f:
+                data = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return empty
+
+        if data.get("version") != PIPELINE_VERSION:
+            return empty
+
+        return data
+
+    def save(self, company_url, mode, fingerprints, entries, report):
+
+        with self._lock:
+            self._reports[(normalize_company_url(company_url), mode)] = report
+
+        if not self.enabled:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        path = self._path(company_url, mode)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump({
+                "version": PIPELINE_VERSION,
+                "fingerprints": fingerprints,
+                "entries": entries,
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def count(self, hit):
+        with self._lock:
+            self.stats["hits" if hit else "misses"] += 1
+
+    def last_report(self, company_url, mode):
+        with self._lock:
+            return self._reports.get((normalize_company_url(company_url), mode))
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_section_cache():
+
+    global _cache
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SectionCache(os.path.join(CACHE_DIR, "sections"))
+
+    return _cache
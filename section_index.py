@@ -0,0 +1,179 @@
+import os
+
+# ------------------------------
+# Single-pass heading -> tables index
+#
+# Every table belongs to the closest h2/h3 before it in document order.
+# Walking headings and tables together once gives that mapping directly,
+# instead of a backward find_previous() scan per table.
+# ------------------------------
+
+PARSER_BACKEND = os.environ.get("FINXTRACT_PARSER", "lxml")
+
+
+class SectionTable:
+
+    __slots__ = ("heading", "table", "position")
+
+    def __init__(self, heading, table, position):
+        # heading is None when no h2/h3 precedes the table
+        self.heading = heading
+        self.table = table
+        self.position = position
+
+    @property
+    def is_shareholding(self):
+        return self.heading is not None and "shareholding" in self.heading.lower()
+
+
+# ------------------------------
+# BeautifulSoup backend
+# ------------------------------
+class Bs4Backend:
+
+    name = "bs4"
+
+    def parse(self, html):
+        from bs4 import BeautifulSoup
+        return BeautifulSoup(html, "lxml")
+
+    def iter_headings_and_tables(self, doc):
+        return doc.find_all(["h2", "h3", "table"])
+
+    def tag(self, el):
+        return el.name
+
+    def text(self, el):
+        return el.get_text(strip=True)
+
+    def table_html(self, table):
+        return str(table)
+
+    def rows(self, table):
+        return [tr.find_all(["th", "td"]) for tr in table.find_all("tr")]
+
+    def is_bold(self, cell):
+        return cell.find(["b", "strong"]) is not None
+
+    def href(self, cell):
+        a = cell.find("a")
+        return a.get("href") if a else None
+
+    def text_content(self, cell):
+        return cell.get_text()
+
+    def is_th(self, cell):
+        return cell.name == "th"
+
+    def needs_read_html(self, table):
+
+        if "display:none" in (table.get("style") or "").replace(" ", ""):
+            return True
+
+        if table.find(["table", "style", "br"]) is not None:
+            return True
+
+        for el in table.find_all(style=True):
+            if "display:none" in el["style"].replace(" ", ""):
+                return True
+
+        return any(
+            thead.find(["td", "th"], recursive=False) is not None
+            for thead in table.find_all("thead")
+        )
+
+    def row_layout(self, table):
+        return [
+            (tr.parent.name, tr.find_all(["th", "td"], recursive=False))
+            for tr in table.find_all("tr")
+        ]
+
+
+# ------------------------------
+# lxml.html backend (XPath, no python-level tree wrappers)
+# ------------------------------
+class LxmlBackend:
+
+    name = "lxml"
+
+    def parse(self, html):
+        import lxml.html
+        return lxml.html.document_fromstring(html)
+
+    def iter_headings_and_tables(self, doc):
+        return doc.xpath("//h2 | //h3 | //table")
+
+    def tag(self, el):
+        return el.tag
+
+    def text(self, el):
+        # same as bs4 get_text(strip=True): strip each text node, no separator
+        return "".join(s.strip() for s in el.xpath(".//text()"))
+
+    def table_html(self, table):
+        import lxml.html
+        return lxml.html.tostring(table, encoding="unicode", with_tail=False)
+
+    def rows(self, table):
+        return [tr.xpath(".//th | .//td") for tr in table.iter("tr")]
+
+    def is_bold(self, cell):
+        return bool(cell.xpath(".//b | .//strong"))
+
+    def href(self, cell):
+        a = cell.xpath(".//a")
+        return a[0].get("href") if a else None
+
+    def text_content(self, cell):
+        return cell.text_content()
+
+    def is_th(self, cell):
+        return cell.tag == "th"
+
+    def needs_read_html(self, table):
+
+        if "display:none" in (table.get("style") or "").replace(" ", ""):
+            return True
+
+        return table.xpath(
+            "boolean(.//table | .//style | .//br | ./thead/td | ./thead/th"
+            " | .//*[contains(translate(@style, ' ', ''), 'display:none')])"
+        )
+
+    def row_layout(self, table):
+        return [
+            (tr.getparent().tag, [c for c in tr if c.tag in ("td", "th")])
+            for tr in table.iter("tr")
+        ]
+
+
+_BACKENDS = {
+    "bs4": Bs4Backend,
+    "lxml": LxmlBackend,
+}
+
+
+def get_parser_backend(name=None):
+
+    name = name or PARSER_BACKEND
+
+    try:
+        return _BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown parser backend: {name!r} (expected one of {sorted(_BACKENDS)})")
+
+
+def index_sections(html, backend):
+
+    doc = backend.parse(html)
+
+    sections = []
+    heading = None
+
+    for el in backend.iter_headings_and_tables(doc):
+        if backend.tag(el) == "table":
+            sections.append(SectionTable(heading, el, len(sections)))
+        else:
+            heading = backend.text(el)
+
+    return sections
@@ -0,0 +1,186 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+# ------------------------------
+# On-disk cache of rendered Screener snapshots
+#
+# One gzip'd JSON file per (company URL, statement mode). File mtime doubles
+# as the LRU clock: hits touch the file, eviction removes the oldest files
+# until the directory fits in the byte budget.
+# ------------------------------
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CACHE_DIR = os.environ.get(
+    "FINXTRACT_CACHE_DIR", os.path.join(BASE_DIR, ".finxtract_cache")
+)
+SNAPSHOT_TTL = int(os.environ.get("FINXTRACT_SNAPSHOT_TTL", str(12 * 3600)))
+SNAPSHOT_CACHE_MAX_MB = int(os.environ.get("FINXTRACT_SNAPSHOT_CACHE_MAX_MB", "512"))
+
+
+def normalize_company_url(url):
+
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip("/").lower() + "/"
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}{path}"
+
+
+class SnapshotCache:
+
+    def __init__(self, directory, ttl=SNAPSHOT_TTL, max_bytes=SNAPSHOT_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "writes": 0,
+            "evictions": 0,
+        }
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_bytes > 0
+
+    def _path(self, url, mode):
+        digest = hashlib.sha1(
+            f"{normalize_company_url(url)}|{mode}".encode()
+        ).hexdigest()
+        return os.path.join(self.directory, digest + ".json.gz")
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    # ------------------------------
+    # Lookup
+    # ------------------------------
+    def get(self, url, mode):
+
+        if not self.enabled:
+            return None
+
+        path = self._path(url, mode)
+
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, EOFError, ValueError):
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+
+        if time.time() - entry.get("fetched_at", 0) > self.ttl:
+            self._remove(path)
+            with self._lock:
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+            return None
+
+        # bump recency for LRU eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        with self._lock:
+            self.stats["hits"] += 1
+
+        return entry["html_periodic"], entry["html_yearly"]
+
+    # ------------------------------
+    # Store + evict
+    # ------------------------------
+    def put(self, url, mode, html_periodic, html_yearly):
+
+        if not self.enabled:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        path = self._path(url, mode)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        entry = {
+            "url": normalize_company_url(url),
+            "mode": mode,
+            "fetched_at": time.time(),
+            "html_periodic": html_periodic,
+            "html_yearly": html_yearly,
+        }
+
+        with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+
+        with self._lock:
+            self.stats["writes"] += 1
+            self._evict()
+
+    def _evict(self):
+
+        entries = []
+        total = 0
+
+        with os.scandir(self.directory) as it:
+            for e in it:
+                if not e.name.endswith(".json.gz"):
+                    continue
+                try:
+                    st = e.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, e.path))
+                total += st.st_size
+
+        entries.sort()
+
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+            self.stats["evictions"] += 1
+
+    def clear(self):
+
+        if not os.path.isdir(self.directory):
+            return
+
+        with self._lock:
+            for name in os.listdir(self.directory):
+                if name.endswith(".json.gz"):
+                    self._remove(os.path.join(self.directory, name))
+
+    def hit_rate(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+
+# ------------------------------
+# Process-wide cache
+# ------------------------------
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_snapshot_cache():
+
+    global _cache
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SnapshotCache(os.path.join(CACHE_DIR, "snapshots"))
+
+    return _cache
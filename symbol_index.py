@@ -0,0 +1,348 @@
+import csv
+import json
+import os
+import re
+import threading
+
+from outbound import get_outbound
+from snapshot_cache import BASE_DIR, CACHE_DIR
+
+# ------------------------------
+# Screener peer name -> NSE symbol resolution
+#
+# Built lazily from a local copy of NSE's equity master list (EQUITY_L.csv,
+# columns SYMBOL / NAME OF COMPANY / ...). Screener abbreviates peer names
+# ("Motil.Oswal.Fin.", "Emk.Global Fin."), so besides exact matches we
+# match abbreviated tokens as prefixes of the full company name tokens and
+# score the result. Every answer is memoized, so repeated peers are O(1).
+# Manual overrides always win.
+# ------------------------------
+
+NSE_MASTER_PATH = os.environ.get(
+    "FINXTRACT_NSE_MASTER", os.path.join(CACHE_DIR, "EQUITY_L.csv")
+)
+SYMBOL_OVERRIDES_PATH = os.environ.get(
+    "FINXTRACT_SYMBOL_OVERRIDES", os.path.join(BASE_DIR, "symbol_overrides.json")
+)
+RESOLVED_CACHE_PATH = os.path.join(CACHE_DIR, "symbol_index.json")
+
+NSE_MASTER_URL = "https://nsearchives.nseindia.com/content/equities/EQUITY_L.csv"
+
+# below this score a peer is left with Screener's own CMP
+MIN_CONFIDENCE = float(os.environ.get("FINXTRACT_SYMBOL_MIN_CONFIDENCE", "0.85"))
+
+# two candidates this close are ambiguous ("Bajaj Fin." -> Finance / Finserv)
+AMBIGUITY_MARGIN = 0.05
+AMBIGUITY_PENALTY = 0.85
+
+# names Screener shows that we already know cannot be derived automatically
+BUILTIN_OVERRIDES = {
+    "Billionbrains": "BILLIONBR",
+    "Motil.Oswal.Fin.": "MOTILALOFS",
+    "360 ONE": "360ONE",
+    "Angel One": "ANGELONE",
+    "Nuvama Wealth": "NUVAMA",
+    "IIFL Capital": "IIFLCAPS",
+    "Anand Rathi Shar": "ANANDRATHI",
+    "Emk.Global Fin.": "EMKAY"
+}
+
+_STOPWORDS = {"ltd", "limited", "the", "and", "&", "of", "co", "company", "india", "inds"}
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def name_tokens(name):
+
+    # "Motil.Oswal.Fin." -> ["motil", "oswal", "fin"]
+    return [t for t in _TOKEN.findall(str(name).lower()) if t not in _STOPWORDS]
+
+
+def name_key(name):
+    return " ".join(name_tokens(name))
+
+
+def _abbreviation_score(short, full):
+
+    # every short token must be a prefix of a full-name token, in order;
+    # score by how much of the full name the short name accounts for
+    if not short or not full:
+        return 0.0
+
+    j = 0
+    covered = 0
+    for token in short:
+        while j < len(full) and not full[j].startswith(token):
+            j += 1
+        if j == len(full):
+            return 0.0
+        covered += len(token) / len(full[j])
+        j += 1
+
+    # an in-order prefix match is the main signal; how much of the full
+    # name it spells out separates "Tata" from "Tata Motors"
+    token_share = len(short) / len(full)
+    prefix_share = covered / len(short)
+    return 0.6 + 0.2 * token_share + 0.2 * prefix_share
+
+
+class SymbolMatch:
+
+    __slots__ = ("symbol", "company", "confidence", "source")
+
+    def __init__(self, symbol, company, confidence, source):
+        self.symbol = symbol
+        self.company = company
+        self.confidence = confidence
+        self.source = source
+
+    def to_dict(self):
+        return {
+            "symbol": self.symbol,
+            "company": self.company,
+            "confidence": self.confidence,
+            "source": self.source,
+        }
+
+    def __repr__(self):
+        return f"<SymbolMatch {self.symbol} {self.confidence} via {self.source}>"
+
+
+class SymbolIndex:
+
+    def __init__(
+        self,
+        master_path=NSE_MASTER_PATH,
+        overrides_path=SYMBOL_OVERRIDES_PATH,
+        cache_path=RESOLVED_CACHE_PATH,
+        min_confidence=MIN_CONFIDENCE,
+    ):
+        self.master_path = master_path
+        self.overrides_path = overrides_path
+        self.cache_path = cache_path
+        self.min_confidence = min_confidence
+
+        self._lock = threading.Lock()
+        self._loaded = False
+
+        self._overrides = {}
+        self._overrides_mtime = None
+        self._exact = {}
+        self._by_first_letter = {}
+        self._resolved = {}
+        self._dirty = False
+
+    # ------------------------------
+    # Lazy load
+    # ------------------------------
+    def _load(self):
+
+        if self._loaded:
+            return
+
+        self._load_overrides()
+
+        try:
+            with open(self.master_path, newline="", encoding="utf-8-sig") as f:
+                for row in csv.DictReader(f):
+                    row = {k.strip().upper(): (v or "").strip() for k, v in row.items() if k}
+                    symbol = row.get("SYMBOL")
+                    company = row.get("NAME OF COMPANY")
+                    if not symbol or not company:
+                        continue
+
+                    entry = (symbol, company, name_tokens(company))
+                    self._exact.setdefault(name_key(company), entry)
+                    self._exact.setdefault(symbol.lower(), entry)
+
+                    if entry[2]:
+                        self._by_first_letter.setdefault(entry[2][0][0], []).append(entry)
+        except OSError:
+            # no master list: only overrides resolve, as before
+            pass
+
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                cached = json.load(f)
+            # drop stale answers if the master list changed since
+            if cached.get("master_mtime") == self._master_mtime():
+                self._resolved = {
+                    k: SymbolMatch(**v) if v else None
+                    for k, v in cached.get("resolved", {}).items()
+                }
+        except (OSError, ValueError, TypeError):
+            pass
+
+        self._loaded = True
+
+    def _load_overrides(self):
+
+        overrides = dict(BUILTIN_OVERRIDES)
+        self._overrides_mtime = self._overrides_file_mtime()
+        try:
+            with open(self.overrides_path, encoding="utf-8") as f:
+                overrides.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+        self._overrides = {name.strip(): symbol for name, symbol in overrides.items()}
+
+    def _overrides_file_mtime(self):
+        try:
+            return os.path.getmtime(self.overrides_path)
+        except OSError:
+            return None
+
+    def _master_mtime(self):
+        try:
+            return os.path.getmtime(self.master_path)
+        except OSError:
+            return None
+
+    def save(self):
+
+        with self._lock:
+            if not self._dirty:
+                return
+
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({
+                    "master_mtime": self._master_mtime(),
+                    "resolved": {
+                        k: m.to_dict() if m else None
+                        for k, m in self._resolved.items()
+                    },
+                }, f)
+            os.replace(tmp, self.cache_path)
+            self._dirty = False
+
+    # ------------------------------
+    # Matching
+    # ------------------------------
+    def _match(self, name):
+
+        key = name_key(name)
+        if not key:
+            return None
+
+        exact = self._exact.get(key)
+        if exact:
+            return SymbolMatch(exact[0], exact[1], 1.0, "exact")
+
+        short = key.split()
+        best = None
+        runner_up = 0.0
+
+        for symbol, company, tokens in self._by_first_letter.get(short[0][0], ()):
+            score = _abbreviation_score(short, tokens)
+            if not score:
+                continue
+            if best is None or score > best.confidence:
+                if best is not None:
+                    runner_up = best.confidence
+                best = SymbolMatch(symbol, company, score, "fuzzy")
+            elif score > runner_up:
+                runner_up = score
+
+        if best is None:
+            return None
+
+        confidence = best.confidence
+        if runner_up and confidence - runner_up < AMBIGUITY_MARGIN:
+            confidence *= AMBIGUITY_PENALTY
+
+        best.confidence = round(confidence, 3)
+        return best
+
+    def match(self, name):
+
+        name = str(name).strip()
+
+        with self._lock:
+            self._load()
+
+            # overrides are never memoized, so entries added to the file by
+            # hand apply to names already resolved (or cached as unknown)
+            if self._overrides_file_mtime() != self._overrides_mtime:
+                self._load_overrides()
+            if name in self._overrides:
+                return SymbolMatch(self._overrides[name], name, 1.0, "override")
+
+            if name in self._resolved:
+                return self._resolved[name]
+
+            result = self._match(name)
+            self._resolved[name] = result
+            self._dirty = True
+
+            return result
+
+    def resolve(self, name):
+
+        result = self.match(name)
+        if result is None or result.confidence < self.min_confidence:
+            return None
+
+        return result.symbol
+
+    def set_override(self, name, symbol):
+
+        name = name.strip()
+
+        with self._lock:
+            self._load()
+
+            overrides = {}
+            try:
+                with open(self.overrides_path, encoding="utf-8") as f:
+                    overrides = json.load(f)
+            except (OSError, ValueError):
+                pass
+
+            overrides[name] = symbol
+            os.makedirs(os.path.dirname(self.overrides_path), exist_ok=True)
+            with open(self.overrides_path, "w", encoding="utf-8") as f:
+                json.dump(overrides, f, indent=2, sort_keys=True)
+
+            self._load_overrides()
+
+
+def download_nse_master(path=NSE_MASTER_PATH, session=None):
+
+    import requests
+
+    session = session or requests.Session()
+    r = get_outbound().request(
+        session.get, NSE_MASTER_URL, headers={"User-Agent": "Mozilla/5.0"}, timeout=30
+    )
+    r.raise_for_status()
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(r.content)
+    os.replace(tmp, path)
+
+
+# ------------------------------
+# Process-wide index
+# ------------------------------
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_symbol_index():
+
+    global _index
+
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SymbolIndex()
+
+    return _index
+
+
+if __name__ == "__main__":
+    download_nse_master()
+    print("NSE equity master list saved to", NSE_MASTER_PATH)
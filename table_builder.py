@@ -0,0 +1,250 @@
+import re
+from io import StringIO
+
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+# ------------------------------
+# Parsed <table> -> DataFrame in one pass
+#
+# Mirrors what pd.read_html does with a table (thead/tbody/tfoot split,
+# header inference, colspan/rowspan, whitespace cleanup, TextParser number
+# conversion), but reads the rows already in memory instead of serializing
+# the table and parsing it again. Bold rows and Raw PDF links are picked up
+# during the same walk. Shapes the fast path does not model (nested tables,
+# <br>, inline display:none, ...) go through read_html as before.
+# ------------------------------
+
+# same cleanup pandas applies to every cell (pandas.io.html._remove_whitespace)
+_RE_WHITESPACE = re.compile(r"[\r\n]+|\s{2,}")
+
+# read_html defaults that end up on TextParser
+_TEXT_PARSER_OPTIONS = {
+    "index_col": None,
+    "skiprows": 0,
+    "parse_dates": False,
+    "thousands": ",",
+    "decimal": ".",
+    "converters": None,
+    "na_values": None,
+    "keep_default_na": True,
+}
+
+
+def _clean(text):
+    return _RE_WHITESPACE.sub(" ", text.strip())
+
+
+def _absolute_link(href):
+    if href.startswith("/"):
+        return "https://www.screener.in" + href
+    return href
+
+
+def _raw_pdf_links(cells, backend):
+
+    links = []
+    for td in cells[1:]:
+        href = backend.href(td)
+        links.append(_absolute_link(href) if href else None)
+
+    return links
+
+
+def _expand_spans(rows, remainder=None, overflow=True):
+
+    # port of pandas' _expand_colspan_rowspan over (text, rowspan, colspan)
+    all_texts = []
+    remainder = remainder if remainder is not None else []
+
+    for cells in rows:
+        texts = []
+        next_remainder = []
+        index = 0
+
+        for text, rowspan, colspan in cells:
+            while remainder and remainder[0][0] <= index:
+                prev_i, prev_text, prev_rowspan = remainder.pop(0)
+                texts.append(prev_text)
+                if prev_rowspan > 1:
+                    next_remainder.append((prev_i, prev_text, prev_rowspan - 1))
+                index += 1
+
+            for _ in range(colspan):
+                texts.append(text)
+                if rowspan > 1:
+                    next_remainder.append((index, text, rowspan - 1))
+                index += 1
+
+        for prev_i, prev_text, prev_rowspan in remainder:
+            texts.append(prev_text)
+            if prev_rowspan > 1:
+                next_remainder.append((prev_i, prev_text, prev_rowspan - 1))
+
+        all_texts.append(texts)
+        remainder = next_remainder
+
+    if not overflow:
+        while remainder:
+            next_remainder = []
+            texts = []
+            for prev_i, prev_text, prev_rowspan in remainder:
+                texts.append(prev_text)
+                if prev_rowspan > 1:
+                    next_remainder.append((prev_i, prev_text, prev_rowspan - 1))
+            all_texts.append(texts)
+            remainder = next_remainder
+
+    return all_texts, remainder
+
+
+def _frame_from_rows(head, body, foot):
+
+    # same steps as pandas.io.html._data_to_frame
+    header = None
+
+    if head:
+        body = head + body
+        if len(head) == 1:
+            header = 0
+        else:
+            header = [i for i, row in enumerate(head) if any(text for text in row)]
+
+    if foot:
+        body += foot
+
+    width = max(len(row) for row in body)
+    for row in body:
+        if len(row) < width:
+            row += [""] * (width - len(row))
+
+    with TextParser(body, header=header, **_TEXT_PARSER_OPTIONS) as tp:
+        return tp.read()
+
+
+def _apply_raw_pdf_links(df, links):
+
+    mask = (
+        df.iloc[:, 0]
+        .astype(str)
+        .str.strip()
+        .str.lower()
+        == "raw pdf"
+    )
+
+    if mask.any():
+        row_index = df[mask].index[0]
+
+        for i, link in enumerate(links):
+            if i + 1 < len(df.columns):
+                df.iat[row_index, i + 1] = link
+
+
+# ------------------------------
+# Fallback: the original read_html round trip
+# ------------------------------
+def _build_with_read_html(table, backend):
+
+    rows = backend.rows(table)
+
+    bold_rows = set()
+    raw_pdf = []
+
+    for i, cells in enumerate(rows):
+        if not cells:
+            continue
+        if backend.is_bold(cells[0]):
+            bold_rows.add(i)
+        if backend.text(cells[0]).lower() == "raw pdf":
+            raw_pdf.append(_raw_pdf_links(cells, backend))
+
+    df = pd.read_html(StringIO(backend.table_html(table)))[0]
+
+    return df, bold_rows, raw_pdf
+
+
+# ------------------------------
+# Fast path
+# ------------------------------
+def _build_from_rows(table, backend):
+
+    thead, tbody, root, tfoot = [], [], [], []
+    sections = {"thead": thead, "tbody": tbody, "table": root, "tfoot": tfoot}
+
+    bold_rows = set()
+    raw_pdf = []
+    has_text = False
+
+    for i, (parent, cells) in enumerate(backend.row_layout(table)):
+
+        target = sections.get(parent)
+        if target is None:
+            return None
+
+        parsed = []
+        all_th = True
+
+        for cell in cells:
+            raw = backend.text_content(cell)
+            if raw.strip("\n"):
+                has_text = True
+
+            parsed.append((
+                _clean(raw),
+                int(cell.get("rowspan") or 1),
+                int(cell.get("colspan") or 1),
+            ))
+            all_th = all_th and backend.is_th(cell)
+
+        target.append((parsed, all_th))
+
+        if cells:
+            if backend.is_bold(cells[0]):
+                bold_rows.add(i)
+
+            # cheap pre-check before the exact get_text(strip=True) compare
+            if parsed[0][0][:3].lower() == "raw" and backend.text(cells[0]).lower() == "raw pdf":
+                raw_pdf.append(_raw_pdf_links(cells, backend))
+
+    # read_html would reject these (no text / ambiguous body); let it decide
+    if not has_text or (tbody and root):
+        return None
+
+    body = tbody + root
+    head = thead
+
+    if not head:
+        while body and body[0][1]:
+            head.append(body.pop(0))
+
+    header, rem = _expand_spans([r for r, _ in head])
+    body, rem = _expand_spans([r for r, _ in body], rem, overflow=len(tfoot) > 0)
+    foot, _ = _expand_spans([r for r, _ in tfoot], rem, overflow=False)
+
+    return _frame_from_rows(header, body, foot), bold_rows, raw_pdf
+
+
+def build_table(table, backend):
+
+    built = None
+    if not backend.needs_read_html(table):
+        built = _build_from_rows(table, backend)
+
+    if built is None:
+        built = _build_with_read_html(table, backend)
+
+    df, bold_rows, raw_pdf = built
+
+    # -----------------------------
+    # Fix Raw PDF links
+    # -----------------------------
+    try:
+        for links in raw_pdf:
+            _apply_raw_pdf_links(df, links)
+    except Exception:
+        pass
+
+    # attach bold info
+    df.attrs["bold_rows"] = bold_rows
+
+    return df
@@ -0,0 +1,54 @@
+from html import escape
+
+from normalize import format_value, period_label
+
+# ------------------------------
+# Result tables -> styled HTML, once per fetch
+#
+# The display markup (values formatted with format_value, Raw PDF cells as
+# links, bold rows highlighted) written in a single walk over the typed
+# frame. The UI keeps the strings with the fetched result and just emits
+# them on reruns.
+# ------------------------------
+
+BOLD_ROW_STYLE = "font-weight:700; background: rgba(255,255,255,0.03);"
+
+
+def _link(url):
+    return f'<a href="{escape(url)}" target="_blank">PDF</a>'
+
+
+def render_table_html(df):
+
+    percent_rows = df.attrs.get("percent_rows", set())
+    links = df.attrs.get("links", {})
+    bold_rows = df.attrs.get("bold_rows", set())
+
+    parts = ['<table border="1" class="dataframe">', "<thead>", '<tr style="text-align: right;">']
+    parts.extend(f"<th>{escape(period_label(c))}</th>" for c in df.columns)
+    parts.append("</tr></thead><tbody>")
+
+    for pos, row in enumerate(df.itertuples(index=False, name=None)):
+
+        percent = pos in percent_rows
+        row_links = links.get(pos, {})
+
+        parts.append(f'<tr style="{BOLD_ROW_STYLE}">' if pos in bold_rows else "<tr>")
+
+        for i, v in enumerate(row):
+            if i in row_links:
+                cell = _link(row_links[i])
+            else:
+                text = format_value(v, percent and i > 0)
+                cell = _link(text) if text.startswith("http") else escape(text)
+            parts.append(f"<td>{cell}</td>")
+
+        parts.append("</tr>")
+
+    parts.append("</tbody></table>")
+
+    return "".join(parts)
+
+
+def render_tables_html(tables):
+    return {name: render_table_html(df) for name, df in tables.items()}
@@ -0,0 +1,105 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from concurrency import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch(key):
+        calls.append(key)
+        release.wait(5)
+        return key.upper()
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do("acme", fetch, "acme")))
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+
+    # give every caller time to join before the leader finishes
+    time.sleep(0.2)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    # a late starter may miss the flight and lead its own call
+    assert len(calls) == flight.stats["leaders"]
+    assert flight.stats["leaders"] + flight.stats["shared"] == 4
+    assert sorted(r for r, _ in results) == ["ACME"] * 4
+    assert sum(shared for _, shared in results) == flight.stats["shared"]
+    assert flight.in_flight() == 0
+
+
+def test_leader_error_reaches_waiters():
+
+    async def main():
+
+        flight = SingleFlight()
+        started = asyncio.Event()
+
+        async def fail():
+            started.set()
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream down")
+
+        leader = asyncio.ensure_future(flight.do_async("acme", fail))
+        await started.wait()
+        waiter = asyncio.ensure_future(flight.do_async("acme", fail))
+
+        for task in (leader, waiter):
+            with pytest.raises(ValueError):
+                await task
+
+        return flight.stats
+
+    assert asyncio.run(main()) == {"leaders": 1, "shared": 1}
+
+
+def test_cancelled_leader_hands_over_to_a_waiter():
+
+    async def main():
+
+        flight = SingleFlight()
+        started = asyncio.Event()
+        runs = []
+
+        async def render(tag):
+            runs.append(tag)
+            started.set()
+            await asyncio.sleep(0.05)
+            return tag
+
+        leader = asyncio.ensure_future(flight.do_async("acme", render, "first"))
+        await started.wait()
+        waiters = [asyncio.ensure_future(flight.do_async("acme", render, "second")) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+        results = await asyncio.gather(*waiters)
+        return runs, results, flight.stats
+
+    runs, results, stats = asyncio.run(main())
+
+    # one waiter re-ran the call, the other got its result
+    assert runs == ["first", "second"]
+    assert sorted(results) == [("second", False), ("second", True)]
+
+    # the waiter that took over is a leader, not a shared caller
+    assert stats == {"leaders": 2, "shared": 1}
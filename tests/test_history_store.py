@@ -0,0 +1,106 @@
+import multiprocessing
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scraper
+from excel_export import workbook_bytes
+from history_store import HistoryStore
+from table_render import render_table_html
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "screener")
+COMPANY_URL = "https://www.screener.in/company/ACME/consolidated/"
+
+
+@pytest.fixture
+def tables(monkeypatch):
+    monkeypatch.setattr(scraper, "patch_peer_comparison_with_live_prices", lambda df: df)
+    with open(os.path.join(FIXTURES, "company_expanded.html"), encoding="utf-8") as f:
+        html = f.read()
+    return scraper.parse_screener_snapshots(html, html)
+
+
+def test_read_back_matches_parsed_tables(tmp_path, tables):
+
+    store = HistoryStore(str(tmp_path))
+    assert store.append(COMPANY_URL, "Consolidated", tables, scraped_at=1000)["new"] > 0
+
+    back = store.read(COMPANY_URL, "Consolidated")
+
+    # only sections with period columns are kept
+    assert "Quarterly Results" in back
+    assert "Peer comparison" not in back
+
+    for name, df in back.items():
+        pd.testing.assert_frame_equal(df, tables[name], check_column_type=False)
+        assert df.attrs == tables[name].attrs, name
+
+    # the repo's own consumers take the read-back frames as they are
+    assert "<a href=" in render_table_html(back["Quarterly Results"])
+    assert workbook_bytes(back)[:2] == b"PK"
+
+
+def test_append_records_revisions(tmp_path, tables):
+
+    store = HistoryStore(str(tmp_path))
+    store.append(COMPANY_URL, "Consolidated", tables, scraped_at=1000)
+
+    unchanged = store.append(COMPANY_URL, "Consolidated", tables, scraped_at=2000)
+    assert unchanged["new"] == unchanged["revised"] == 0
+
+    quarters = tables["Quarterly Results"].copy()
+    quarters.attrs = dict(tables["Quarterly Results"].attrs)
+    quarters.iat[0, 1] = 999.0
+
+    result = store.append(COMPANY_URL, "Consolidated", {"Quarterly Results": quarters}, scraped_at=3000)
+    assert result == {"new": 0, "revised": 1, "unchanged": 20}
+
+    assert store.read(COMPANY_URL, "Consolidated")["Quarterly Results"].iat[0, 1] == 999.0
+    revisions = store.revisions(COMPANY_URL, "Consolidated")
+    assert list(revisions[["old_value", "new_value"]].iloc[0]) == [1234.0, 999.0]
+
+
+def _append_from_process(directory, value, compact_parts):
+
+    os.environ["FINXTRACT_HISTORY_COMPACT_PARTS"] = str(compact_parts)
+
+    import scraper
+    from history_store import HistoryStore
+
+    scraper.patch_peer_comparison_with_live_prices = lambda df: df
+    with open(os.path.join(FIXTURES, "company_expanded.html"), encoding="utf-8") as f:
+        html = f.read()
+    tables = scraper.parse_screener_snapshots(html, html)
+
+    store = HistoryStore(directory)
+    for i in range(5):
+        tables["Quarterly Results"].iat[0, 1] = float(value * 100 + i)
+        store.append(COMPANY_URL, "Consolidated", tables, scraped_at=1000 + i)
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="appends are flock-serialized on POSIX")
+def test_appends_from_several_processes(tmp_path):
+
+    # batch workers are separate processes writing the same company
+    ctx = multiprocessing.get_context("spawn")
+    procs = [
+        ctx.Process(target=_append_from_process, args=(str(tmp_path), n, 3))
+        for n in range(4)
+    ]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+        assert p.exitcode == 0
+
+    store = HistoryStore(str(tmp_path))
+    back = store.read(COMPANY_URL, "Consolidated")["Quarterly Results"]
+
+    # every append revised the same cell: 1 new + 19 revisions, none lost
+    revisions = store.revisions(COMPANY_URL, "Consolidated")
+    assert len(revisions) == 19
+    assert back.iat[0, 1] == revisions["new_value"].iloc[-1]
@@ -0,0 +1,132 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import http_engine
+import scraper
+from http_engine import ScreenerHttpEngine
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "screener")
+COMPANY_URL = "https://www.screener.in/company/ACME/consolidated/"
+
+
+def _fixture(name):
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+
+    # path -> file; schedules are keyed by their "parent" row
+    routes = {
+        "/company/ACME/consolidated/": ("company.html", "text/html"),
+        "/api/company/11/peers/": ("peers.html", "text/html"),
+    }
+    schedules = {
+        "Sales": "schedule-sales.json",
+        "Expenses": "schedule-expenses.json",
+    }
+    missing = set()
+
+    def do_GET(self):
+
+        parts = urlsplit(self.path)
+
+        if parts.path == "/api/company/7/schedules/":
+            parent = parse_qs(parts.query).get("parent", [""])[0]
+            route = (self.schedules.get(parent), "application/json")
+        else:
+            route = self.routes.get(parts.path, (None, None))
+
+        name, content_type = route
+        if name is None or parts.path in self.missing:
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        body = _fixture(name)
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def engine():
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    engine = ScreenerHttpEngine(base_url=f"http://127.0.0.1:{server.server_port}", workers=2)
+    yield engine
+
+    engine.close()
+    server.shutdown()
+    server.server_close()
+    FixtureHandler.missing = set()
+
+
+@pytest.fixture(autouse=True)
+def no_live_prices(monkeypatch):
+    # peer CMPs would come from NSE; compare the parsed page only
+    monkeypatch.setattr(scraper, "patch_peer_comparison_with_live_prices", lambda df: df)
+
+
+def _assert_same_tables(a, b):
+
+    assert list(a) == list(b)
+
+    for name in a:
+        pd.testing.assert_frame_equal(a[name], b[name])
+        assert a[name].attrs == b[name].attrs, name
+
+
+def test_http_engine_matches_browser_snapshot(engine):
+
+    html_periodic, html_yearly = engine.fetch_snapshots(COMPANY_URL)
+    over_http = scraper.parse_screener_snapshots(html_periodic, html_yearly)
+
+    # what the browser engine captures once every "+" row is expanded
+    expanded = _fixture("company_expanded.html").decode("utf-8")
+    in_browser = scraper.parse_screener_snapshots(expanded, expanded)
+
+    _assert_same_tables(over_http, in_browser)
+
+    # schedule rows sit right under their parent, values typed
+    quarters = over_http["Quarterly Results"]
+    assert list(quarters.iloc[:5, 0]) == [
+        "Sales\xa0-", "YOY Sales Growth %", "Expenses\xa0-", "Material Cost %", "Employee Cost",
+    ]
+    assert list(quarters.iloc[4, 1:]) == [1200.0, 1250.25, 1300.0]
+
+
+def test_schedule_values_are_written_as_the_page_shows_them():
+
+    assert http_engine._cell_text(None) == ""
+    assert http_engine._cell_text(51.0) == "51"
+    assert http_engine._cell_text(1250.25) == "1250.25"
+    assert http_engine._cell_text(" 10% ") == "10%"
+
+
+def test_auto_mode_falls_back_to_browser_on_request_errors(engine, monkeypatch):
+
+    FixtureHandler.missing = {"/api/company/11/peers/"}
+    monkeypatch.setattr(http_engine, "_engine", engine)
+
+    monkeypatch.setattr(scraper, "SCRAPE_ENGINE", "auto")
+    assert scraper.fetch_snapshots_over_http(COMPANY_URL) is None
+
+    monkeypatch.setattr(scraper, "SCRAPE_ENGINE", "http")
+    with pytest.raises(Exception):
+        scraper.fetch_snapshots_over_http(COMPANY_URL)
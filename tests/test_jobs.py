@@ -0,0 +1,79 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jobs
+import scraper
+from jobs import JobRunner
+from section_fingerprints import SectionCache
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "screener")
+COMPANY_URL = "https://www.screener.in/company/ACME/consolidated/"
+
+
+@pytest.fixture
+def local_scrape(tmp_path, monkeypatch):
+
+    with open(os.path.join(FIXTURES, "company_expanded.html"), encoding="utf-8") as f:
+        html = f.read()
+
+    # the peer patch blocks until the test has seen the first section
+    first_section_seen = threading.Event()
+
+    def patch(df):
+        assert first_section_seen.wait(5)
+        return df
+
+    def fetch(company_url, mode, on_stage=None):
+        on_stage("render")
+        return html, html
+
+    monkeypatch.setattr(jobs, "get_worker_client", lambda: None)
+    monkeypatch.setattr(jobs, "resolve_company_url", lambda name, mode: None if name == "NOPE" else COMPANY_URL)
+    monkeypatch.setattr(jobs, "fetch_screener_snapshots", fetch)
+    monkeypatch.setattr(scraper, "patch_peer_comparison_with_live_prices", patch)
+    monkeypatch.setattr(scraper, "get_section_cache", lambda: SectionCache(str(tmp_path)))
+    return first_section_seen
+
+
+def _wait(job, until):
+    for _ in range(500):
+        if until(job):
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"timed out waiting on {job!r}")
+
+
+def test_sections_arrive_before_the_job_is_done(local_scrape):
+
+    job = JobRunner(workers=1).submit("Acme", "Consolidated")
+
+    # Quarterly Results is published while the peer table is still pending
+    _wait(job, lambda j: j.stage == "peer patch")
+    assert list(job.sections()) == ["Quarterly Results"]
+    assert not job.done
+    assert 0 < job.progress() < 1
+
+    local_scrape.set()
+    _wait(job, lambda j: j.done)
+
+    assert job.status == "done", job.error
+    assert job.company_url == COMPANY_URL
+    assert list(job.sections()) == ["Quarterly Results", "Peer comparison", "Shareholding Pattern (Yearly)"]
+    assert list(job.stage_started) == ["search", "render", "parse", "peer patch"]
+    assert job.progress() == 1.0
+
+
+def test_errors_end_the_job(local_scrape):
+
+    job = JobRunner(workers=1).submit("NOPE", "Consolidated")
+    _wait(job, lambda j: j.done)
+
+    assert job.status == "error"
+    assert job.error.startswith("LookupError")
+    assert not job.sections()
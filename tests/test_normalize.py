@@ -0,0 +1,31 @@
+import math
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from normalize import format_value
+
+
+def test_format_value_small():
+    assert format_value(1.5) == "1.5"
+    assert format_value(0.123) == "0.12"
+    assert format_value(12.0) == "12"
+    assert format_value(-3.456) == "-3.46"
+    assert format_value(-0.001) == "0"
+
+
+def test_format_value_large():
+    assert format_value(123456.78) == "123456.78"
+    assert format_value(1234567.5) == "1234567.5"
+    assert format_value(98765432.1) == "98765432.1"
+    assert format_value(np.float64(1234567.25)) == "1234567.25"
+
+
+def test_format_value_percent_and_missing():
+    assert format_value(12.5, percent=True) == "12.5%"
+    assert format_value(math.nan) == ""
+    assert format_value(None) == ""
+    assert format_value("TTM") == "TTM"
@@ -0,0 +1,153 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import outbound
+from outbound import CircuitOpen, HostState, OutboundScheduler
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class FakeResponse:
+
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # time is shared with concurrency.TokenBucket, so the bucket sees it too
+    clock = FakeClock()
+    monkeypatch.setattr(outbound.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(outbound.time, "sleep", clock.sleep)
+    monkeypatch.setattr(outbound.random, "uniform", lambda a, b: b)
+    return clock
+
+
+def _host(rate=4.0, max_rate=6.0):
+    return HostState("example.com", concurrency=2, rate=rate, burst=10, max_rate=max_rate)
+
+
+def test_rate_creeps_up_and_halves_once_per_burst_of_429s(clock):
+
+    state = _host()
+
+    state.record_response(200, 0.01)
+    state.record_response(200, 0.01)
+    assert state.bucket.rate == 5.0
+
+    # a burst of 429s halves the rate once
+    state.record_response(429, 0.01)
+    state.record_response(429, 0.01)
+    assert state.bucket.rate == 2.5
+    assert state.stats["throttled"] == 2
+
+    clock.now += outbound.DECREASE_EVERY
+    state.record_response(503, 0.01)
+    assert state.bucket.rate == 1.25
+
+    # capped on the way up
+    for _ in range(20):
+        state.record_response(200, 0.01)
+    assert state.bucket.rate == 6.0
+
+
+def test_403_is_not_a_throttle(clock):
+
+    # NSE's expired-cookie answer; the client refreshes and retries
+    state = _host()
+    state.record_response(403, 0.01)
+
+    assert state.stats["throttled"] == 0
+    assert state.bucket.rate == 4.5
+
+
+def test_breaker_opens_probes_and_closes(clock):
+
+    state = _host()
+
+    for _ in range(outbound.BREAKER_FAILURES):
+        state.check()
+        state.record_error(timeout=False)
+
+    assert state.summary()["circuit"] == "open"
+    with pytest.raises(CircuitOpen):
+        state.check()
+
+    # after the cool-down one probe goes through, everyone else waits
+    clock.now += outbound.BREAKER_COOLDOWN
+    state.check()
+    assert state.summary()["circuit"] == "half-open"
+    with pytest.raises(CircuitOpen):
+        state.check()
+
+    # failed probe: open for another cool-down
+    state.record_response(502, 0.01)
+    assert state.summary()["circuit"] == "open"
+    assert state.stats["breaker_trips"] == 2
+    with pytest.raises(CircuitOpen):
+        state.check()
+
+    clock.now += outbound.BREAKER_COOLDOWN
+    state.check()
+    state.record_response(200, 0.01)
+    assert state.summary()["circuit"] == "closed"
+    state.check()
+
+
+def test_request_retries_honouring_retry_after(clock):
+
+    responses = [FakeResponse(503, {"Retry-After": "7"}), FakeResponse(200)]
+    sent = []
+
+    def send(url, **kwargs):
+        sent.append(url)
+        return responses.pop(0)
+
+    scheduler = OutboundScheduler()
+    r = scheduler.request(send, "https://example.com/api", retries=2)
+
+    assert r.status_code == 200
+    assert len(sent) == 2
+    assert clock.slept == [7.0]
+
+    stats = scheduler.stats("https://example.com/other")
+    assert stats["requests"] == 2
+    assert stats["retries"] == 1
+    assert stats["ok"] == 1
+    assert stats["circuit"] == "closed"
+
+
+def test_token_waits_are_counted(clock):
+
+    state = HostState("example.com", concurrency=1, rate=2.0, burst=1, max_rate=2.0)
+    scheduler = OutboundScheduler()
+
+    scheduler._enter(state)
+    state.slots.release()
+    scheduler._enter(state)
+    state.slots.release()
+
+    stats = state.summary()
+    assert stats["requests"] == 2
+    assert stats["waited"] == 1
+    assert stats["wait_s"] == 0.5
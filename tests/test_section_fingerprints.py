@@ -0,0 +1,92 @@
+import os
+import re
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scraper
+import section_fingerprints
+from section_fingerprints import SectionCache
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "screener")
+CHANGE_KEY = ("https://www.screener.in/company/ACME/consolidated/", "Consolidated")
+
+
+@pytest.fixture
+def html():
+    with open(os.path.join(FIXTURES, "company_expanded.html"), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = SectionCache(str(tmp_path), enabled=True)
+    monkeypatch.setattr(scraper, "get_section_cache", lambda: cache)
+    return cache
+
+
+@pytest.fixture
+def peer_patches(monkeypatch):
+    calls = []
+
+    def patch(df):
+        calls.append(df)
+        return df
+
+    monkeypatch.setattr(scraper, "patch_peer_comparison_with_live_prices", patch)
+    return calls
+
+
+def _parse(html):
+    return scraper.parse_screener_snapshots(html, html, change_key=CHANGE_KEY)
+
+
+def test_unchanged_sections_are_reused(html, cache, peer_patches):
+
+    first = _parse(html)
+    assert cache.last_report(*CHANGE_KEY)["new"] == list(first)
+    looked_up = dict(cache.stats)
+
+    second = _parse(html)
+
+    # nothing rebuilt, and the peer table is not re-priced
+    assert cache.stats["misses"] == looked_up["misses"]
+    assert cache.stats["hits"] == looked_up["hits"] + sum(looked_up.values())
+    assert len(peer_patches) == 1
+
+    assert list(second) == list(first)
+    for name in first:
+        pd.testing.assert_frame_equal(second[name], first[name])
+        assert second[name].attrs == first[name].attrs, name
+
+    assert cache.last_report(*CHANGE_KEY)["unchanged"] == list(first)
+
+
+def test_only_changed_sections_are_rebuilt(html, cache, peer_patches):
+
+    _parse(html)
+    changed = _parse(html.replace("<td>1,234</td>", "<td>1,235</td>", 1))
+
+    report = cache.last_report(*CHANGE_KEY)
+    assert report["changed"] == ["Quarterly Results"]
+    assert "Quarterly Results" not in report["unchanged"]
+    assert changed["Quarterly Results"].iat[0, 1] == 1235.0
+
+    # a section that disappears is reported, not kept
+    without_peers = re.sub(r'<section id="peers">.*?</section>', "", html, flags=re.S)
+    assert "Peer comparison" not in _parse(without_peers)
+    assert cache.last_report(*CHANGE_KEY)["removed"] == ["Peer comparison"]
+
+
+def test_pipeline_version_bump_drops_old_entries(html, cache, peer_patches, monkeypatch):
+
+    first = _parse(html)
+
+    monkeypatch.setattr(section_fingerprints, "PIPELINE_VERSION", "test-bump")
+    _parse(html)
+
+    assert cache.last_report(*CHANGE_KEY)["new"] == list(first)
+    assert len(peer_patches) == 2
@@ -0,0 +1,73 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import snapshot_cache
+from snapshot_cache import SnapshotCache
+
+COMPANY_URL = "https://www.screener.in/company/ACME/consolidated/"
+
+
+def _page(name, size=4000):
+    # random text so gzip cannot shrink entries to nothing
+    return name + os.urandom(size).hex()
+
+
+def _age(cache, url, mode, mtime):
+    path = cache._path(url, mode)
+    os.utime(path, (mtime, mtime))
+
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+
+    now = [1_000_000.0]
+    monkeypatch.setattr(snapshot_cache.time, "time", lambda: now[0])
+
+    cache = SnapshotCache(str(tmp_path), ttl=60)
+    cache.put(COMPANY_URL, "Consolidated", "<periodic>", "<yearly>")
+
+    # lookups are keyed by the normalized URL and the statement mode
+    assert cache.get("https://WWW.screener.in/company/acme/consolidated", "Consolidated") == (
+        "<periodic>", "<yearly>",
+    )
+    assert cache.get(COMPANY_URL, "Standalone") is None
+
+    now[0] += 61
+    assert cache.get(COMPANY_URL, "Consolidated") is None
+    assert not os.listdir(tmp_path)
+
+    assert cache.stats["hits"] == 1
+    assert cache.stats["expired"] == 1
+    assert cache.stats["misses"] == 2
+
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path):
+
+    cache = SnapshotCache(str(tmp_path), ttl=3600, max_bytes=10**9)
+    urls = [f"https://www.screener.in/company/C{i}/" for i in range(3)]
+
+    for i, url in enumerate(urls):
+        cache.put(url, "Consolidated", _page(url), _page(url))
+        _age(cache, url, "Consolidated", 1_000 + i)
+
+    # a hit makes the oldest entry the most recent one
+    assert cache.get(urls[0], "Consolidated") is not None
+
+    entry_size = os.path.getsize(cache._path(urls[0], "Consolidated"))
+    cache.max_bytes = entry_size * 3 + entry_size // 2     # room for three
+    cache.put("https://www.screener.in/company/NEW/", "Consolidated", _page("new"), _page("new"))
+
+    assert cache.get(urls[1], "Consolidated") is None
+    assert cache.get(urls[0], "Consolidated") is not None
+    assert cache.get(urls[2], "Consolidated") is not None
+    assert cache.stats["evictions"] == 1
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+
+    cache = SnapshotCache(str(tmp_path), ttl=0)
+    cache.put(COMPANY_URL, "Consolidated", "<periodic>", "<yearly>")
+
+    assert cache.get(COMPANY_URL, "Consolidated") is None
+    assert not os.listdir(tmp_path)
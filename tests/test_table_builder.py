@@ -0,0 +1,89 @@
+import os
+import sys
+from io import StringIO
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import table_builder
+from section_index import get_parser_backend, index_sections
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "screener")
+
+TABLES = {
+    "thead and tbody": """
+        <table><thead><tr><th></th><th>Mar 2023</th><th>Mar 2024</th></tr></thead>
+        <tbody><tr><td>Sales</td><td>1,234</td><td>1,410.5</td></tr>
+        <tr><td>OPM %</td><td>19%</td><td></td></tr></tbody></table>""",
+    "th row as header": """
+        <table><tr><th>Name</th><th>CMP Rs.</th></tr>
+        <tr><td>Angel One</td><td>2,500.50</td></tr>
+        <tr><td>360 ONE</td><td>1,100</td></tr></table>""",
+    "two header rows": """
+        <table><thead><tr><th></th><th colspan="2">FY24</th></tr>
+        <tr><th></th><th>H1</th><th>H2</th></tr></thead>
+        <tbody><tr><td>Sales</td><td>10</td><td>12</td></tr></tbody></table>""",
+    "rowspan and colspan": """
+        <table><thead><tr><th>Segment</th><th>Metric</th><th>Value</th></tr></thead>
+        <tbody><tr><td rowspan="2">Retail</td><td>Sales</td><td>5</td></tr>
+        <tr><td>Margin</td><td>7</td></tr>
+        <tr><td colspan="2">Total</td><td>12</td></tr></tbody></table>""",
+    "whitespace and tfoot": """
+        <table><thead><tr><th>Row</th><th>Value</th></tr></thead>
+        <tbody><tr><td>
+            Net   Profit
+        </td><td> 1,000 </td></tr></tbody>
+        <tfoot><tr><td>Total</td><td>1,000</td></tr></tfoot></table>""",
+    "no header": """
+        <table><tr><td>Promoters</td><td>50.12%</td></tr>
+        <tr><td>Public</td><td>49.88%</td></tr></table>""",
+}
+
+
+def _fixture_tables():
+    with open(os.path.join(FIXTURES, "company_expanded.html"), encoding="utf-8") as f:
+        html = f.read()
+    backend = get_parser_backend("bs4")
+    return {
+        f"fixture {i} ({s.heading})": backend.table_html(s.table)
+        for i, s in enumerate(index_sections(html, backend))
+    }
+
+
+CASES = {**TABLES, **_fixture_tables()}
+
+
+@pytest.mark.parametrize("backend_name", ["bs4", "lxml"])
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_fast_path_matches_read_html(case, backend_name):
+
+    html = CASES[case]
+    backend = get_parser_backend(backend_name)
+    table = index_sections(html, backend)[0].table
+
+    built = table_builder._build_from_rows(table, backend)
+    assert built is not None, "expected the fast path to handle this table"
+
+    pd.testing.assert_frame_equal(built[0], pd.read_html(StringIO(html))[0])
+
+
+@pytest.mark.parametrize("backend_name", ["bs4", "lxml"])
+def test_bold_rows_and_raw_pdf_links_match_fallback(backend_name, monkeypatch):
+
+    html = """
+        <table><thead><tr><th></th><th>Jun 2024</th><th>Sep 2024</th></tr></thead>
+        <tbody><tr><td class="text"><strong>Net Profit</strong></td><td>10</td><td>11</td></tr>
+        <tr><td>Raw PDF</td><td><a href="/company/source/1/">PDF</a></td><td></td></tr></tbody></table>"""
+
+    backend = get_parser_backend(backend_name)
+    fast = table_builder.build_table(index_sections(html, backend)[0].table, backend)
+
+    # force the read_html round trip for the same table
+    monkeypatch.setattr(table_builder, "_build_from_rows", lambda table, backend: None)
+    slow = table_builder.build_table(index_sections(html, backend)[0].table, backend)
+
+    pd.testing.assert_frame_equal(fast, slow)
+    assert fast.attrs["bold_rows"] == slow.attrs["bold_rows"] == {1}
+    assert fast.iat[1, 1] == "https://www.screener.in/company/source/1/"
@@ -0,0 +1,77 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import watchlist
+
+
+@pytest.fixture
+def fake_scrape(monkeypatch):
+
+    state = {"running": 0, "peak": 0, "cancelled": []}
+    delays = {"SLOW": 5.0}
+
+    def resolve(name, mode):
+        return None if name == "MISSING" else f"https://www.screener.in/company/{name}/"
+
+    async def fetch(company_url, mode, pool=None):
+        name = company_url.rstrip("/").rsplit("/", 1)[-1]
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        try:
+            await asyncio.sleep(delays.get(name, 0.02))
+        except asyncio.CancelledError:
+            state["cancelled"].append(name)
+            raise
+        finally:
+            state["running"] -= 1
+        if name == "BROKEN":
+            raise RuntimeError("layout changed")
+        return f"<periodic {name}>", f"<yearly {name}>"
+
+    def parse(html_periodic, html_yearly, backend=None, change_key=None):
+        return {"Quarterly Results": html_periodic}
+
+    monkeypatch.setattr(watchlist, "resolve_company_url", resolve)
+    monkeypatch.setattr(watchlist, "fetch_screener_snapshots_async", fetch)
+    monkeypatch.setattr(watchlist, "parse_screener_snapshots", parse)
+    return state
+
+
+async def _collect(entries, **kwargs):
+    return [r async for r in watchlist.iter_watchlist(entries, pool=object(), **kwargs)]
+
+
+def test_parallelism_is_bounded(fake_scrape):
+
+    entries = [f"C{i}" for i in range(8)]
+    results = asyncio.run(_collect(entries, concurrency=3))
+
+    assert sorted(r.name for r in results) == entries
+    assert all(r.ok for r in results)
+    assert fake_scrape["peak"] == 3
+    assert results[0].tables == {"Quarterly Results": f"<periodic {results[0].name}>"}
+
+
+def test_failures_and_timeouts_stay_per_company(fake_scrape):
+
+    entries = ["ACME", ("BROKEN", "Standalone"), "MISSING", "SLOW"]
+    results = {r.name: r for r in asyncio.run(_collect(entries, timeout=0.5))}
+
+    assert results["ACME"].ok
+    assert results["BROKEN"].error == "RuntimeError: layout changed"
+    assert results["BROKEN"].mode == "Standalone"
+    assert results["MISSING"].error.startswith("LookupError")
+    assert results["SLOW"].error == "timed out after 0.5s"
+
+    # the timeout cancels the render itself
+    assert fake_scrape["cancelled"] == ["SLOW"]
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        watchlist.normalize_watchlist([("ACME", "Quarterly")])
@@ -0,0 +1,131 @@
+import asyncio
+import time
+
+import metrics
+from browser_pool import get_browser_pool
+from scraper import (
+    fetch_screener_snapshots_async,
+    parse_screener_snapshots,
+    resolve_company_url,
+)
+
+# ------------------------------
+# Concurrent watchlist scraping
+#
+# Renders run on the shared browser pool (async Playwright) and are awaited
+# from here, while the blocking bits - search API call, cache lookups and
+# HTML parsing - go to worker threads so they never stall the event loop.
+# ------------------------------
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_TIMEOUT = 180
+STATEMENT_MODES = ("Consolidated", "Standalone")
+
+
+class WatchlistResult:
+
+    def __init__(self, name, mode):
+        self.name = name
+        self.mode = mode
+        self.company_url = None
+        self.tables = {}
+        self.error = None
+        self.elapsed = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        status = "ok" if self.ok else f"error={self.error!r}"
+        return f"<WatchlistResult {self.name!r} {self.mode} {status} {self.elapsed}s>"
+
+
+def normalize_watchlist(entries):
+
+    normalized = []
+
+    for entry in entries:
+
+        if isinstance(entry, str):
+            name, mode = entry, "Consolidated"
+        else:
+            name, mode = entry
+
+        name = name.strip()
+        if not name:
+            continue
+
+        if mode not in STATEMENT_MODES:
+            raise ValueError(f"Unknown statement mode for {name!r}: {mode!r}")
+
+        normalized.append((name, mode))
+
+    return normalized
+
+
+async def _scrape_company(pool, name, mode, result):
+
+    company_url = await asyncio.to_thread(resolve_company_url, name, mode)
+    if not company_url:
+        raise LookupError(f"No Screener company found for {name!r}")
+
+    result.company_url = company_url
+
+    # awaited on this loop, so the per-entry timeout cancels the render; the
+    # fetch is still shared with UI sessions / other entries for the company
+    html_periodic, html_yearly = await fetch_screener_snapshots_async(company_url, mode, pool=pool)
+
+    result.tables = await asyncio.to_thread(
+        parse_screener_snapshots, html_periodic, html_yearly, None, (company_url, mode)
+    )
+
+
+async def iter_watchlist(entries, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT, pool=None):
+
+    pool = pool or get_browser_pool()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_one(name, mode):
+
+        result = WatchlistResult(name, mode)
+
+        async with semaphore:
+            t0 = time.perf_counter()
+            try:
+                # each task has its own context, so every entry is its own trace
+                with metrics.trace("watchlist entry", company=name, mode=mode):
+                    await asyncio.wait_for(_scrape_company(pool, name, mode, result), timeout)
+            except asyncio.TimeoutError:
+                result.error = f"timed out after {timeout}s"
+            except Exception as e:
+                # one bad company must never take the rest of the batch down
+                result.error = f"{type(e).__name__}: {e}"
+            result.elapsed = round(time.perf_counter() - t0, 2)
+
+        return result
+
+    tasks = [
+        asyncio.ensure_future(run_one(name, mode))
+        for name, mode in normalize_watchlist(entries)
+    ]
+
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def scrape_watchlist(entries, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT, on_result=None):
+
+    async def collect():
+        results = []
+        async for result in iter_watchlist(entries, concurrency, timeout):
+            if on_result is not None:
+                on_result(result)
+            results.append(result)
+        return results
+
+    return asyncio.run(collect())
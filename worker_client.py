@@ -0,0 +1,204 @@
+import math
+import os
+import threading
+import time
+
+import metrics
+
+# ------------------------------
+# Thin client for the scraping worker service (worker_service.py)
+#
+# With FINXTRACT_WORKER_URL set, the UI sends searches and scrapes to the
+# worker over HTTP/JSON instead of running Playwright in its own process.
+# Section tables travel as JSON (see table_to_json); df.attrs survive the
+# trip so rendering and the Excel export behave the same on both sides.
+# ------------------------------
+
+WORKER_URL = os.environ.get("FINXTRACT_WORKER_URL", "").rstrip("/")
+WORKER_TIMEOUT = float(os.environ.get("FINXTRACT_WORKER_TIMEOUT", "300"))
+WORKER_BUSY_RETRIES = int(os.environ.get("FINXTRACT_WORKER_BUSY_RETRIES", "5"))
+
+
+class WorkerError(Exception):
+    pass
+
+
+class WorkerBusy(WorkerError):
+    pass
+
+
+# ------------------------------
+# Section tables <-> JSON
+# ------------------------------
+def _json_value(v):
+
+    if v is None:
+        return None
+    if isinstance(v, float):
+        return None if math.isnan(v) else v
+    if hasattr(v, "item"):
+        # numpy scalars
+        return _json_value(v.item())
+    return v
+
+
+def table_to_json(df):
+
+    import pandas as pd
+
+    columns = []
+    for c in df.columns:
+        if isinstance(c, pd.Period):
+            columns.append({"period": str(c)})
+        else:
+            columns.append(str(c))
+
+    attrs = dict(df.attrs)
+    for key in ("percent_rows", "bold_rows"):
+        if key in attrs:
+            attrs[key] = sorted(attrs[key])
+    if "links" in attrs:
+        attrs["links"] = [
+            [row, col, url]
+            for row, cols in attrs["links"].items()
+            for col, url in cols.items()
+        ]
+
+    return {
+        "columns": columns,
+        "float_columns": [i for i, dtype in enumerate(df.dtypes) if dtype.kind == "f"],
+        "index": [_json_value(v) for v in df.index],
+        "data": [[_json_value(v) for v in df.iloc[:, i]] for i in range(df.shape[1])],
+        "attrs": attrs,
+    }
+
+
+def table_from_json(data):
+
+    import numpy as np
+    import pandas as pd
+
+    columns = [
+        pd.Period(c["period"], freq="M") if isinstance(c, dict) else c
+        for c in data["columns"]
+    ]
+    float_columns = set(data["float_columns"])
+
+    values = {}
+    for i, column in enumerate(data["data"]):
+        if i in float_columns:
+            values[i] = np.array([math.nan if v is None else v for v in column], dtype=float)
+        else:
+            values[i] = np.array(column, dtype=object)
+
+    df = pd.DataFrame(values, index=data["index"])
+    df.columns = columns
+
+    attrs = dict(data["attrs"])
+    for key in ("percent_rows", "bold_rows"):
+        if key in attrs:
+            attrs[key] = set(attrs[key])
+    if "links" in attrs:
+        links = {}
+        for row, col, url in attrs["links"]:
+            links.setdefault(row, {})[col] = url
+        attrs["links"] = links
+    df.attrs = attrs
+
+    return df
+
+
+def tables_to_json(tables):
+    return [[name, table_to_json(df)] for name, df in tables.items()]
+
+
+def tables_from_json(items):
+    return {name: table_from_json(data) for name, data in items}
+
+
+# ------------------------------
+# Client
+# ------------------------------
+class WorkerClient:
+
+    def __init__(self, base_url=WORKER_URL, timeout=WORKER_TIMEOUT, busy_retries=WORKER_BUSY_RETRIES):
+
+        import requests
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.busy_retries = busy_retries
+        self.session = requests.Session()
+
+    def _call(self, method, path, **kwargs):
+
+        for attempt in range(self.busy_retries + 1):
+
+            r = self.session.request(
+                method, self.base_url + path, timeout=self.timeout, **kwargs
+            )
+
+            if r.status_code != 503:
+                break
+
+            # queue full: back off for as long as the worker asks
+            if attempt == self.busy_retries:
+                raise WorkerBusy(f"worker queue full after {attempt + 1} attempts")
+            time.sleep(float(r.headers.get("Retry-After", "1")))
+
+        try:
+            body = r.json()
+        except ValueError:
+            raise WorkerError(f"{method} {path}: HTTP {r.status_code}, not JSON")
+
+        if r.status_code >= 400:
+            raise WorkerError(body.get("error") or f"{method} {path}: HTTP {r.status_code}")
+
+        return body
+
+    def health(self):
+        return self._call("GET", "/healthz")
+
+    def queue(self):
+        return self._call("GET", "/queue")
+
+    def resolve_company_url(self, company_name, mode=None):
+        body = {"company": company_name}
+        if mode:
+            body["mode"] = mode
+        return self._call("POST", "/search", json=body)["company_url"]
+
+    def fetch_snapshots(self, company_url, mode):
+        body = self._call("POST", "/snapshots", json={"company_url": company_url, "mode": mode})
+        return body["html_periodic"], body["html_yearly"]
+
+    def scrape(self, company_name=None, mode="Consolidated", company_url=None):
+
+        # returns (company_url, tables) like scrape_screener_financials_by_name
+        body = self._call(
+            "POST", "/scrape",
+            json={"company": company_name, "company_url": company_url, "mode": mode},
+        )
+        # stage timings from the worker process join the caller's trace
+        metrics.replay_spans(body.get("spans", []))
+        return body["company_url"], tables_from_json(body["tables"])
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_worker_client():
+
+    # None when no worker is configured: scrape in-process as before
+    global _client
+
+    if not WORKER_URL:
+        return None
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = WorkerClient()
+
+    return _client
@@ -0,0 +1,332 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import metrics
+from concurrency import SingleFlight
+
+# ------------------------------
+# Scraping worker service
+#
+#   python worker_service.py --workers 4 --queue 16 --port 8700
+#
+# Runs the scraper core in a fixed pool of worker processes (each with its
+# own HTTP sessions and browser pool) behind a small HTTP/JSON API, so the
+# Streamlit UI can stay a thin client (FINXTRACT_WORKER_URL) and browsers
+# can be scaled on their own nodes.
+#
+#   GET  /healthz     liveness + pool state
+#   GET  /queue       queue depth / capacity / counters
+#   GET  /metrics     stage timings (Prometheus text, see metrics.py)
+#   POST /search      {"company", "mode"?}          -> {"company_url"}
+#   POST /snapshots   {"company_url", "mode"}       -> {"html_periodic", "html_yearly"}
+#   POST /scrape      {"company" | "company_url", "mode"} -> {"company_url", "tables"}
+#
+# At most workers + queue jobs are admitted; past that the service answers
+# 503 with Retry-After instead of letting requests pile up.
+# ------------------------------
+
+WORKER_HOST = os.environ.get("FINXTRACT_WORKER_HOST", "127.0.0.1")
+WORKER_PORT = int(os.environ.get("FINXTRACT_WORKER_PORT", "8700"))
+WORKER_PROCESSES = int(os.environ.get("FINXTRACT_WORKER_PROCESSES", "2"))
+WORKER_QUEUE = int(os.environ.get("FINXTRACT_WORKER_QUEUE", "16"))
+RETRY_AFTER = 2         # seconds suggested to clients on 503
+
+STATEMENT_MODES = ("Consolidated", "Standalone")
+
+
+class QueueFull(Exception):
+    pass
+
+
+class BadRequest(Exception):
+    pass
+
+
+# ------------------------------
+# Worker side (runs in the pool processes)
+# ------------------------------
+def _scrape(company_name, mode, company_url=None):
+
+    import metrics
+    from scraper import fetch_screener_snapshots, parse_screener_snapshots, resolve_company_url
+    from worker_client import tables_to_json
+
+    with metrics.trace("worker scrape", company=company_name or company_url, mode=mode) as trace:
+
+        if not company_url:
+            company_url = resolve_company_url(company_name, mode)
+            if not company_url:
+                return {"company_url": None, "tables": [], "spans": trace.to_dict()["spans"]}
+
+        html_periodic, html_yearly = fetch_screener_snapshots(company_url, mode)
+        tables = parse_screener_snapshots(
+            html_periodic, html_yearly, change_key=(company_url, mode)
+        )
+
+        # serialized here so the parent only has to write bytes
+        with metrics.span("serialize"):
+            payload = tables_to_json(tables)
+
+    return {"company_url": company_url, "tables": payload, "spans": trace.to_dict()["spans"]}
+
+
+def _snapshots(company_url, mode):
+
+    from scraper import fetch_screener_snapshots
+
+    html_periodic, html_yearly = fetch_screener_snapshots(company_url, mode)
+    return {"html_periodic": html_periodic, "html_yearly": html_yearly}
+
+
+# ------------------------------
+# Pool with admission control
+# ------------------------------
+class WorkerPool:
+
+    def __init__(self, workers=WORKER_PROCESSES, queue=WORKER_QUEUE):
+        self.workers = max(1, workers)
+        self.capacity = self.workers + max(0, queue)
+
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._flight = SingleFlight()
+
+        self.started = time.time()
+        self.stats = {"accepted": 0, "rejected": 0, "completed": 0, "failed": 0, "restarts": 0}
+
+    def _pool(self):
+        if self._executor is None:
+            # the processes split each host's request budget between them
+            os.environ.setdefault("FINXTRACT_OUTBOUND_SHARE", str(self.workers))
+
+            # spawn: workers start clean instead of inheriting the server's threads
+            ctx = multiprocessing.get_context("spawn")
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx)
+        return self._executor
+
+    def _admit(self):
+        with self._lock:
+            if self._pending >= self.capacity:
+                self.stats["rejected"] += 1
+                raise QueueFull(f"{self._pending} jobs queued or running")
+            self._pending += 1
+            self.stats["accepted"] += 1
+            return self._pool()
+
+    def _execute(self, fn, *args):
+
+        executor = self._admit()
+        outcome = "failed"
+
+        try:
+            result = executor.submit(fn, *args).result()
+            outcome = "completed"
+            # stage timings from the worker process feed this /metrics
+            metrics.replay_spans(result.get("spans", []))
+            return result
+        except BrokenProcessPool:
+            # a worker died (OOM kill, browser crash); start a fresh pool
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+                    self.stats["restarts"] += 1
+            executor.shutdown(wait=False)
+            raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self.stats[outcome] += 1
+
+    def run(self, key, fn, *args):
+
+        # identical requests already in flight share one job (and one slot)
+        result, _ = self._flight.do(key, self._execute, fn, *args)
+        return result
+
+    def queue_state(self):
+        with self._lock:
+            pending = self._pending
+            stats = dict(self.stats)
+        return {
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "running": min(pending, self.workers),
+            "queued": max(0, pending - self.workers),
+            "coalesced": self._flight.stats["shared"],
+            **stats,
+        }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# ------------------------------
+# HTTP API
+# ------------------------------
+def _mode(body):
+    mode = body.get("mode") or "Consolidated"
+    if mode not in STATEMENT_MODES:
+        raise BadRequest(f"unknown statement mode {mode!r}")
+    return mode
+
+
+class WorkerHandler(BaseHTTPRequestHandler):
+
+    pool = None     # set by serve()
+
+    def _send_json(self, status, payload, headers=None):
+
+        data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            raise BadRequest("body is not JSON")
+        if not isinstance(body, dict):
+            raise BadRequest("body must be a JSON object")
+        return body
+
+    def do_GET(self):
+
+        if self.path == "/healthz":
+            self._send_json(200, {
+                "status": "ok",
+                "pid": os.getpid(),
+                "uptime": round(time.time() - self.pool.started, 1),
+                "workers": self.pool.workers,
+            })
+        elif self.path == "/queue":
+            self._send_json(200, self.pool.queue_state())
+        elif self.path == "/metrics":
+            data = metrics.get_registry().render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self._send_json(404, {"error": f"no route {self.path}"})
+
+    def do_POST(self):
+
+        routes = {
+            "/search": self._search,
+            "/snapshots": self._snapshots,
+            "/scrape": self._scrape,
+        }
+
+        route = routes.get(self.path)
+        if route is None:
+            self._send_json(404, {"error": f"no route {self.path}"})
+            return
+
+        try:
+            self._send_json(200, route(self._body()))
+        except BadRequest as e:
+            self._send_json(400, {"error": str(e)})
+        except QueueFull as e:
+            self._send_json(503, {"error": f"queue full: {e}"}, {"Retry-After": str(RETRY_AFTER)})
+        except Exception as e:
+            self._send_json(502, {"error": f"{type(e).__name__}: {e}"})
+
+    def _search(self, body):
+
+        from scraper import find_screener_company_by_name, resolve_company_url
+
+        # a search is one cached API call; answered here, not on the pool
+        company = (body.get("company") or "").strip()
+        if not company:
+            raise BadRequest("missing 'company'")
+
+        if body.get("mode"):
+            return {"company_url": resolve_company_url(company, _mode(body))}
+        return {"company_url": find_screener_company_by_name(company)}
+
+    def _snapshots(self, body):
+
+        from snapshot_cache import normalize_company_url
+
+        company_url = (body.get("company_url") or "").strip()
+        if not company_url:
+            raise BadRequest("missing 'company_url'")
+
+        mode = _mode(body)
+        key = ("snapshots", normalize_company_url(company_url), mode)
+        return self.pool.run(key, _snapshots, company_url, mode)
+
+    def _scrape(self, body):
+
+        from snapshot_cache import normalize_company_url
+
+        company = (body.get("company") or "").strip()
+        company_url = (body.get("company_url") or "").strip() or None
+        if not company and not company_url:
+            raise BadRequest("missing 'company' or 'company_url'")
+
+        mode = _mode(body)
+        target = normalize_company_url(company_url) if company_url else company.lower()
+        return self.pool.run(("scrape", target, mode), _scrape, company, mode, company_url)
+
+    def log_message(self, format, *args):
+        print(f"--- worker {self.address_string()} {format % args}")
+
+
+def serve(host=WORKER_HOST, port=WORKER_PORT, workers=WORKER_PROCESSES, queue=WORKER_QUEUE):
+
+    pool = WorkerPool(workers, queue)
+    handler = type("BoundWorkerHandler", (WorkerHandler,), {"pool": pool})
+
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+
+    print(f"--- Worker service on http://{host}:{server.server_port} "
+          f"({pool.workers} processes, queue {pool.capacity - pool.workers})")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.shutdown()
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Run the FinXtract scraping worker service.")
+    parser.add_argument("--host", default=WORKER_HOST)
+    parser.add_argument("--port", type=int, default=WORKER_PORT)
+    parser.add_argument("--workers", type=int, default=WORKER_PROCESSES,
+                        help=f"scraper processes (default: {WORKER_PROCESSES})")
+    parser.add_argument("--queue", type=int, default=WORKER_QUEUE,
+                        help=f"jobs allowed to wait for a free process (default: {WORKER_QUEUE})")
+
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.workers, args.queue)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())